@@ -0,0 +1,374 @@
+"""Benchmarks for the simulation hot paths.
+
+Usage:
+    python benchmarks/bench.py [--output results.json] [--baseline benchmarks/baseline.json] [--tolerance 0.4] [--filter name]
+
+Every benchmark reports operations per second, best of several rounds.
+With --baseline the run fails (exit code 1) when a benchmark is slower
+than the baseline by more than the tolerance, when a benchmark has no
+baseline entry (rerun with --output benchmarks/baseline.json after adding
+one), or when a benchmark raises. Any raising benchmark fails the run even
+without --baseline. Rendering benchmarks need a display and are only
+skipped when no GL context can be created, ARCADE_HEADLESS=1 renders
+without one.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+import pymunk  # noqa: E402
+
+BENCHMARKS: Dict[str, Callable[[], Tuple[Callable[[], None], int]]] = {}
+
+# pyglet raises these when there is no display or GL context, importing
+# pyglet.gl to name them would itself raise without a display
+NO_CONTEXT_ERRORS = {"NoSuchDisplayException", "NoSuchConfigException", "ContextException"}
+
+
+class NoContext(Exception):
+    """No GL context can be created, rendering benchmarks are skipped."""
+
+
+def open_window():
+    import arcade
+
+    try:
+        return arcade.Window(800, 608, "bench", visible=False)
+    except Exception as error:
+        if type(error).__name__ in NO_CONTEXT_ERRORS:
+            raise NoContext(str(error)) from error
+        raise
+
+
+def benchmark(name: str):
+    """Registers a setup function returning (run, operations per run)."""
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+def measure(run: Callable[[], None], operations: int, rounds: int = 15, min_time: float = 0.2) -> Dict[str, float]:
+    # Calibrate how many calls make one round last at least min_time
+    calls = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            break
+        calls *= 2
+
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(calls):
+            run()
+        timings.append((time.perf_counter() - start) / calls)
+
+    best = min(timings)
+    return {"ops_per_sec": operations / best, "seconds_per_run": best,
+            "mean_seconds_per_run": sum(timings) / len(timings), "operations": operations}
+
+
+@benchmark("physics.robot_step")
+def physics_robot_step():
+    from classes import Simulation
+
+    simulation = Simulation()
+
+    return lambda: simulation.step(1 / 60), 1
+
+
+def fleet_step(count: int):
+    from classes import Simulation
+
+    simulation = Simulation()
+    simulation.add_fleet([pymunk.Vec2d(20 + (index % 20) * 35, 100 + (index // 20) * 5)
+                          for index in range(count)])
+
+    return lambda: simulation.step(1 / 60), 1
+
+
+@benchmark("physics.fleet_10_step")
+def physics_fleet_10_step():
+    return fleet_step(10)
+
+
+@benchmark("physics.fleet_100_step")
+def physics_fleet_100_step():
+    return fleet_step(100)
+
+
+@benchmark("trapezoid.calculate")
+def trapezoid_calculate():
+    from classes.controls.Trapezoidal import Constraints, State, TrapezoidProfile
+
+    profile = TrapezoidProfile(Constraints(2, 1), State(math.pi / 2, 0), State(0, 0))
+    times = [index * profile.total_time / 1000 for index in range(1000)]
+
+    def run():
+        for t in times:
+            profile.calculate(t)
+
+    return run, len(times)
+
+
+@benchmark("trapezoid.calculate_many")
+def trapezoid_calculate_many():
+    from classes.controls.Trapezoidal import Constraints, State, TrapezoidProfile
+
+    profile = TrapezoidProfile(Constraints(2, 1), State(math.pi / 2, 0), State(0, 0))
+    times = np.linspace(0, profile.total_time, 100000)
+
+    return lambda: profile.calculate_many(times), len(times)
+
+
+@benchmark("trapezoid.time_left_until")
+def trapezoid_time_left_until():
+    from classes.controls.Trapezoidal import Constraints, State, TrapezoidProfile
+
+    profile = TrapezoidProfile(Constraints(2, 1), State(math.pi / 2, 0), State(0, 0))
+    targets = [index * math.pi / 2 / 1000 for index in range(1000)]
+
+    def run():
+        for target in targets:
+            profile.time_left_until(target)
+
+    return run, len(targets)
+
+
+def s_curve(dt: float):
+    from classes.controls.SCurve import SCurve
+
+    profile = SCurve.generate_s_curve_profile
+    samples = len(profile(2, 1, 0.5, dt, 10)[0])
+
+    return lambda: profile(2, 1, 0.5, dt, 10), samples
+
+
+@benchmark("scurve.generate_dt_1e-2")
+def scurve_dt_1e2():
+    return s_curve(1e-2)
+
+
+@benchmark("scurve.generate_dt_1e-3")
+def scurve_dt_1e3():
+    return s_curve(1e-3)
+
+
+@benchmark("scurve.generate_dt_1e-4")
+def scurve_dt_1e4():
+    return s_curve(1e-4)
+
+
+@benchmark("ik.calculate_angles")
+def ik_calculate_angles():
+    from classes.kinematics.DoubleJointed import DoubleJointed
+
+    ik = DoubleJointed(150, 40)
+    points = [pymunk.Vec2d(x, y) for x, y in np.random.default_rng(0).uniform(-200, 200, (1000, 2))]
+
+    def run():
+        for point in points:
+            ik.position = point
+            ik.calculate_angles()
+
+    return run, len(points)
+
+
+@benchmark("ik.solve")
+def ik_solve():
+    from classes.kinematics.DoubleJointed import DoubleJointed
+
+    ik = DoubleJointed(150, 40)
+    points = np.random.default_rng(0).uniform(-200, 200, (100000, 2))
+
+    return lambda: ik.solve(points), len(points)
+
+
+@benchmark("pid.compute")
+def pid_compute():
+    from classes.controls.PID import PID
+
+    pid = PID(50000, 1000, 30000)
+    state = {"now": 0.0}
+
+    def run():
+        now = state["now"]
+        for index in range(1000):
+            now += 1 / 60
+            pid.compute(1, 0.5, now)
+        state["now"] = now
+
+    return run, 1000
+
+
+@benchmark("pid.batch_compute_1000")
+def pid_batch_compute():
+    from classes.controls.PID import PIDBatch
+
+    pid = PIDBatch(50000, 1000, 30000, shape=(500, 2))
+    setpoints = np.ones((500, 2))
+    measurements = np.full((500, 2), 0.5)
+    state = {"now": 0.0}
+
+    def run():
+        state["now"] += 1 / 60
+        pid.compute(setpoints, measurements, state["now"])
+
+    return run, setpoints.size
+
+
+@benchmark("graph.append_data")
+def graph_append_data():
+    import arcade
+    from classes._Graph import Graph
+
+    graph = Graph(300, 500, 600, 200, "bench")
+    for label in ("a", "b", "c"):
+        graph.add_parameter(label, arcade.color.BLUE)
+
+    def run():
+        for index in range(1000):
+            graph.append_data("a", index)
+            graph.append_data("b", -index)
+            graph.append_data("c", 0.5)
+
+    return run, 3000
+
+
+@benchmark("graph.draw")
+def graph_draw():
+    import arcade
+    from classes._Graph import Graph
+
+    window = open_window()
+    graph = Graph(300, 500, 600, 200, "bench")
+    for label in ("a", "b", "c"):
+        graph.add_parameter(label, arcade.color.BLUE)
+    for index in range(graph.capacity):
+        for label in ("a", "b", "c"):
+            graph.append_data(label, math.sin(index / 10))
+
+    def run():
+        for label in ("a", "b", "c"):
+            graph.append_data(label, 0.5)
+        graph.draw()
+        window.ctx.finish()
+
+    return run, 1
+
+
+@benchmark("graph.draw_decimated_60s")
+def graph_draw_decimated():
+    import arcade
+    from classes._Graph import Graph
+
+    window = open_window()
+    graph = Graph(300, 500, 600, 200, "bench")
+    graph.decimate = True
+    graph.set_duration(60)
+    for label in ("a", "b", "c"):
+        graph.add_parameter(label, arcade.color.BLUE)
+    for index in range(graph.capacity):
+        for label in ("a", "b", "c"):
+            graph.append_data(label, math.sin(index / 10))
+
+    def run():
+        for label in ("a", "b", "c"):
+            graph.append_data(label, 0.5)
+        graph.draw()
+        window.ctx.finish()
+
+    return run, 1
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float, expected: Iterable[str] = ()) -> bool:
+    """Checks results against the baseline.
+
+    Fails on regressions, on results without a baseline entry and on
+    expected benchmarks (baseline entries that were selected and not
+    skipped) that produced no result.
+    """
+    passed = True
+    for name in expected:
+        if name in baseline and name not in results:
+            print(f"{name:32} no result          FAILED")
+            passed = False
+
+    for name, result in results.items():
+        if name not in baseline:
+            print(f"{name:32} no baseline entry  MISSING")
+            passed = False
+            continue
+
+        ratio = result["ops_per_sec"] / baseline[name]["ops_per_sec"]
+        status = "ok"
+        if ratio < 1 - tolerance:
+            status = "REGRESSION"
+            passed = False
+        print(f"{name:32} {ratio:7.2f}x baseline  {status}")
+
+    return passed
+
+
+def main(arguments: Optional[list] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results from an earlier --output")
+    # Best of 15 rounds still drifts by about a third between runs on a busy machine
+    parser.add_argument("--tolerance", type=float, default=0.4,
+                        help="allowed slowdown against the baseline, as a fraction")
+    parser.add_argument("--filter", default="", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=15)
+    options = parser.parse_args(arguments)
+
+    results: Dict[str, Dict[str, float]] = {}
+    skipped: Dict[str, str] = {}
+    failed: Dict[str, str] = {}
+    selected = [name for name in BENCHMARKS if options.filter in name]
+    for name in selected:
+        try:
+            run, operations = BENCHMARKS[name]()
+            results[name] = measure(run, operations, options.rounds)
+        except NoContext as error:
+            # Rendering benchmarks need a GL context, which some boxes lack
+            skipped[name] = repr(error)
+            print(f"{name:32} skipped: {error}")
+            continue
+        except Exception as error:
+            failed[name] = repr(error)
+            print(f"{name:32} FAILED: {error!r}")
+            continue
+
+        print(f"{name:32} {results[name]['ops_per_sec']:14.1f} ops/s")
+
+    report = {"python": platform.python_version(), "platform": platform.platform(),
+              "benchmarks": results, "skipped": skipped, "failed": failed}
+    if options.output:
+        with open(options.output, "w") as file:
+            json.dump(report, file, indent=2)
+
+    if options.baseline:
+        with open(options.baseline) as file:
+            baseline = json.load(file)["benchmarks"]
+        expected = [name for name in selected if name not in skipped]
+        if not compare(results, baseline, options.tolerance, expected):
+            return 1
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import arcade
+import numpy as np
+import pymunk
+from typing import Dict, List, Sequence
+from .Gains import Gains
+from .Geometry import Geometry
+from .kinematics.DoubleJointed import DoubleJointed
+from .controls.PID import PIDBatch
+from .Robot import Robot
+from .Timer import Clock, WallClock
+from .Profiler import profiler
+
+JOINTS = ("arm", "wrist")
+ROBOT_COLLISION = "robot"
+
+
+# Robots take turns on the upper 16 category bits, other shapes keep the defaults
+ROBOT_CATEGORIES = [1 << bit for bit in range(16, 32)]
+ROBOT_MASK = pymunk.ShapeFilter.ALL_MASKS() ^ sum(ROBOT_CATEGORIES)
+
+
+def isolate(physics_engine: arcade.PymunkPhysicsEngine, robots: Sequence[Robot]):
+    """Makes robots pass through each other while each robot's own parts still collide.
+
+    Each robot gets one of 16 category bits and a mask without the others,
+    so most robot pairs are filtered out before contacts are generated. The
+    few robots sharing a bit are told apart by a collision handler that drops
+    contacts between shapes owned by different robots.
+    """
+    if ROBOT_COLLISION not in physics_engine.collision_types:
+        physics_engine.collision_types.append(ROBOT_COLLISION)
+    collision_type = physics_engine.collision_types.index(ROBOT_COLLISION)
+
+    # pymunk hands back the same handler for the same pair, so owners accumulate across fleets
+    handler = physics_engine.space.add_collision_handler(
+        collision_type, collision_type)
+    owners = handler.data.setdefault("owners", {})
+    handler.begin = lambda arbiter, space, data: data["owners"][arbiter.shapes[0]] is data["owners"][arbiter.shapes[1]]
+
+    for robot in robots:
+        category = ROBOT_CATEGORIES[handler.data.setdefault("count", 0) % len(ROBOT_CATEGORIES)]
+        handler.data["count"] += 1
+        shape_filter = pymunk.ShapeFilter(categories=category, mask=ROBOT_MASK | category)
+        for physics_object in robot.physics_objects:
+            physics_object.shape.collision_type = collision_type
+            physics_object.shape.filter = shape_filter
+            owners[physics_object.shape] = robot
+
+
+class Fleet:
+    """Many robots sharing one physics space, controlled in a single NumPy pass.
+
+    Controller state is kept as (N, 2) arrays with one column per joint
+    (arm, wrist), so a fleet of one behaves like a lone Robot.
+
+    Keyword arguments:
+    gains -- per robot controller gains, Gains() for the robot or the whole fleet when None
+    geometries -- per robot sizes and masses, the default Geometry when None
+    isolated -- robots pass through each other, see isolate(); False makes them collide
+    """
+
+    def __init__(self, physics_engine: arcade.PymunkPhysicsEngine, offsets: Sequence[pymunk.Vec2d], gains: Sequence[Gains] = None, clock: Clock = None, sprite_list: arcade.SpriteList = None, isolated: bool = True, geometries: Sequence[Geometry] = None) -> None:
+        self.physics_engine = physics_engine
+        self.clock = clock if clock is not None else WallClock()
+        gains = list(gains) if gains is not None else [
+            None for _ in offsets]
+        self.gains = [robot_gains if robot_gains is not None else Gains() for robot_gains in gains]
+        geometries = list(geometries) if geometries is not None else [
+            None for _ in offsets]
+
+        self.robots: List[Robot] = [
+            Robot(physics_engine, offset=offset, clock=self.clock,
+                  gains=robot_gains, sprite_list=sprite_list, geometry=geometry)
+            for offset, robot_gains, geometry in zip(offsets, self.gains, geometries)]
+
+        self.isolated = isolated
+        if isolated:
+            # Robots overlap when packed densely
+            isolate(physics_engine, self.robots)
+
+        self.pid = PIDBatch(self.__gain_array("kp"), self.__gain_array(
+            "ki"), self.__gain_array("kd"))
+        self.ff_g = self.__gain_array("g")
+
+        self.lever = np.array(
+            [[robot.arm_length / 2, robot.wrist_length / 2] for robot in self.robots])
+        # Per robot link lengths broadcast through the batch solve
+        self.ik = DoubleJointed(np.array([robot.arm_length for robot in self.robots], dtype=float),
+                                np.array([robot.wrist_length for robot in self.robots], dtype=float))
+        self.bodies = [(robot.arm_body.body, robot.wrist_body.body)
+                       for robot in self.robots]
+
+        count = len(self.robots)
+        self.targets = np.zeros((count, 2))
+        self.angles = np.zeros((count, 2))
+        self.feedforward = np.zeros((count, 2))
+        self.outputs = np.zeros((count, 2))
+        self.forces = self.outputs.tolist()
+        self.levers = self.lever.tolist()
+
+        for index, robot in enumerate(self.robots):
+            self.targets[index] = (robot.arm_target_angle,
+                                   robot.wrist_target_angle)
+
+    def __gain_array(self, name: str) -> np.ndarray:
+        return np.array([[getattr(gains, f"{joint}_{name}") for joint in JOINTS] for gains in self.gains], dtype=float)
+
+    def __len__(self):
+        return len(self.robots)
+
+    def move_endpoint(self, index: int, position: pymunk.Vec2d):
+        robot = self.robots[index]
+        robot.move_endpoint(position)
+        self.targets[index] = (robot.arm_target_angle,
+                               robot.wrist_target_angle)
+
+    def move_endpoints(self, positions: np.ndarray) -> np.ndarray:
+        """Moves every robot's endpoint with one batch IK solve.
+
+        Unreachable robots keep their previous targets. Returns the reachability mask.
+        """
+        _, negative, reachable = self.ik.solve(positions)
+        self.targets[reachable, 0] = negative[reachable, 0]
+        self.targets[reachable, 1] = negative[reachable, 1] + \
+            negative[reachable, 0]
+
+        return reachable
+
+    def set_targets(self, arm: np.ndarray, wrist: np.ndarray):
+        self.targets[:, 0] = arm
+        self.targets[:, 1] = wrist
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"targets": self.targets.copy(), "outputs": self.outputs.copy(),
+                "pid": self.pid.get_state()}
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.targets[:] = state["targets"]
+        self.outputs[:] = state["outputs"]
+        self.forces = self.outputs.tolist()
+        self.pid.set_state(state["pid"])
+
+    def read_angles(self) -> np.ndarray:
+        self.angles[:] = [(arm.angle, wrist.angle)
+                          for arm, wrist in self.bodies]
+        return self.angles
+
+    def on_update(self):
+        with profiler.scope("control"):
+            self.update_controller()
+            self.apply_outputs()
+
+    def update_controller(self):
+        now = self.clock.now()
+
+        for index, robot in enumerate(self.robots):
+            if robot.plan is not None:
+                arm, wrist = robot.plan.calculate(robot.timer.get_delta_sec())
+                self.targets[index] = (arm.position, wrist.position)
+            elif robot.motion is not None:
+                self.targets[index, 0] = robot.motion.calculate(
+                    robot.timer.get_delta_sec()).position
+
+        angles = self.read_angles()
+        pid_outputs = self.pid.compute(self.targets, angles, now)
+
+        # Feedforward at zero velocity on both joints, as in Robot.update_controller
+        np.cos(angles, out=self.feedforward)
+        self.feedforward *= self.ff_g
+        np.add(pid_outputs, self.feedforward, out=self.outputs)
+
+        self.forces = self.outputs.tolist()
+        for robot, (arm_force, wrist_force) in zip(self.robots, self.forces):
+            robot.arm_output = arm_force
+            robot.wrist_output = wrist_force
+
+    def apply_outputs(self):
+        for (arm, wrist), (arm_force, wrist_force), (arm_lever, wrist_lever) in zip(self.bodies, self.forces, self.levers):
+            arm.apply_force_at_local_point((0, arm_force), (arm_lever, 0))
+            wrist.apply_force_at_local_point(
+                (0, wrist_force), (wrist_lever, 0))
@@ -0,0 +1,34 @@
+from dataclasses import dataclass, fields, replace
+
+
+@dataclass
+class Gains:
+    arm_kp: float = 50000
+    arm_ki: float = 1000
+    arm_kd: float = 30000
+    arm_s: float = 0
+    arm_g: float = 65000
+    arm_v: float = 0
+    arm_a: float = 0
+
+    wrist_kp: float = 70000
+    wrist_ki: float = 10000
+    wrist_kd: float = 2000
+    wrist_s: float = 0
+    wrist_g: float = 0
+    wrist_v: float = 0
+    wrist_a: float = 0
+
+    def scaled(self, factor: float) -> "Gains":
+        """Returns a copy with every gain multiplied by factor."""
+        return replace(self, **{field.name: getattr(self, field.name) * factor for field in fields(self)})
+
+    @classmethod
+    def held(cls) -> "Gains":
+        """Returns the defaults tuned for outputs held over every sub-step.
+
+        The defaults assume each output pushes for one of the 10 sub-steps of
+        a step, a scheduled controller (Simulation control_period) holds it
+        for all of them, so the same force acts ten times as long.
+        """
+        return cls().scaled(0.1)
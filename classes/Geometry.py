@@ -0,0 +1,27 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class Geometry:
+    """Sizes in pixels, masses and motor settings of a Robot's bodies."""
+    chassis_width: float = 150
+    chassis_height: float = 20
+    chassis_mass: float = 50
+    wheel_radius: float = 10
+    wheel_mass: float = 1
+    wheel_motor_rate: float = 0
+
+    structure_width: float = 20
+    structure_height: float = 140
+    structure_mass: float = 20
+
+    arm_length: float = 150
+    arm_width: float = 20
+    arm_mass: float = 10
+    shoulder_motor_rate: float = 0
+    shoulder_motor_max_force: float = 3000000
+
+    wrist_length: float = 40
+    wrist_width: float = 10
+    wrist_mass: float = 3
+    wrist_motor_rate: float = 0
@@ -1,41 +1,235 @@
-import datetime as dt
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-import random
+import multiprocessing
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
 
-fig = plt.figure()
-ax = fig.add_subplot(1, 1, 1)
-xs = []
-ys = []
-frame = 0
+Color = Tuple[int, ...]
 
 
-def animate(i, xs, ys):
+def to_float_color(color: Color) -> Tuple[float, ...]:
+    """Converts an arcade 0-255 color to the 0-1 floats matplotlib expects."""
+    return tuple(channel / 255 for channel in color)
 
-    # Read temperature (Celsius) from TMP102
-    temp_c = round(random.random() * 100, 2)
 
-    # Add x and y to lists
-    xs.append(round(i * (1000 / 60), 1))
-    ys.append(temp_c)
+class Graph:
+    """Plots parameters with matplotlib in a separate process.
 
-    # Limit x and y lists to 20 items
-    xs = xs[-60:]
-    ys = ys[-60:]
+    Takes the same add_parameter/append_data calls as _Graph.Graph, so it can
+    stand in for the in-window graph. Samples are written into shared memory
+    rings without any locking or pickling, the plotting process reads them
+    at its own pace and redraws only the lines by blitting.
 
-    # Draw x and y lists
-    ax.clear()
-    ax.plot(xs, ys)
+    Keyword arguments:
+    center_x, center_y -- unused, kept so calls match _Graph.Graph
+    width, height -- size of the plot window, in pixels
+    max_parameters -- how many parameters the shared memory has room for
+    """
 
-    # Format plot
-    plt.xticks(rotation=45, ha='right')
-    plt.subplots_adjust(bottom=0.30)
-    plt.title('TMP102 Temperature over Time')
-    plt.ylabel('Temperature (deg C)')
+    def __init__(self, center_x: int, center_y: int, width: int, height: int, label: str, duration: int = 8, FPS: int = 60, max_parameters: int = 32) -> None:
+        self.center_x = center_x
+        self.center_y = center_y
+        self.width = width
+        self.height = height
+        self.label = label
+        self.min: float = 0
+        self.max: float = 0
+        self.duration = duration
+        self.FPS = FPS
+        self.auto_zoom = True
+        self.max_parameters = max_parameters
+        self.capacity = int(FPS * duration)
+        self.visible = self.capacity
 
+        self.parameters: Dict[str, int] = {}
+        self.colors: Dict[int, Tuple[float, ...]] = {}
+        self.memory: Optional[shared_memory.SharedMemory] = None
+        self.written: Optional[np.ndarray] = None
+        self.samples: Optional[np.ndarray] = None
+        self.commands = None
+        self.process = None
 
-# Set up plot to call animate() function periodically
-ani = animation.FuncAnimation(
-    fig, animate, fargs=(xs, ys), interval=1000/60)
-plt.show()
-plt.close("all")
+    def start(self):
+        """Allocates the shared memory and starts the plotting process, append_data calls this when needed."""
+        if self.process is not None:
+            return
+
+        self.memory = shared_memory.SharedMemory(
+            create=True, size=self.max_parameters * (8 + self.capacity * 4))
+        self.written, self.samples = rings(
+            self.memory, self.max_parameters, self.capacity)
+        self.written[:] = 0
+
+        # spawn keeps the plotting process clear of the parent's GL context
+        context = multiprocessing.get_context("spawn")
+        self.commands = context.Queue()
+        self.process = context.Process(target=plot, args=(self.memory.name, self.max_parameters, self.capacity, self.FPS,
+                                                          self.label, self.width, self.height, self.commands), daemon=True)
+        self.process.start()
+
+        for parameter, index in self.parameters.items():
+            self.commands.put(("add", index, parameter, self.colors[index]))
+        self.commands.put(("limits", self.auto_zoom, self.min, self.max))
+        self.commands.put(("duration", self.visible))
+
+    def close(self):
+        if self.process is None:
+            return
+
+        self.commands.put(("close",))
+        self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process = None
+        self.written = self.samples = None
+        self.memory.close()
+        self.memory.unlink()
+        self.memory = None
+
+    def set_min(self, min: float):
+        self.auto_zoom = False
+        self.min = min
+        self.__send("limits", self.auto_zoom, self.min, self.max)
+
+    def set_max(self, max: float):
+        self.auto_zoom = False
+        self.max = max
+        self.__send("limits", self.auto_zoom, self.min, self.max)
+
+    def set_duration(self, duration: int):
+        """Shows the last `duration` seconds, at most the duration the graph was created with."""
+        self.visible = min(int(self.FPS * duration), self.capacity)
+        self.__send("duration", self.visible)
+
+    def add_parameter(self, parameter: str, color: Color):
+        if len(self.parameters) == self.max_parameters:
+            raise ValueError(f"Graph has room for {self.max_parameters} parameters")
+
+        index = len(self.parameters)
+        self.parameters[parameter] = index
+        self.colors[index] = to_float_color(color)
+        self.__send("add", index, parameter, self.colors[index])
+
+    def append_data(self, parameter: str, data: float):
+        if self.process is None:
+            self.start()
+
+        index = self.parameters[parameter]
+        written = self.written[index]
+        self.samples[index, written % self.capacity] = data
+        # Publish the count only after the sample is in place
+        self.written[index] = written + 1
+
+    def update(self):
+        pass
+
+    def draw(self):
+        pass
+
+    def __send(self, *command):
+        if self.process is not None:
+            self.commands.put(command)
+
+
+def rings(memory: shared_memory.SharedMemory, parameters: int, capacity: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Returns the per parameter sample counts and the (parameters, capacity) sample rings inside the shared memory."""
+    written = np.ndarray((parameters,), dtype=np.int64, buffer=memory.buf)
+    samples = np.ndarray((parameters, capacity), dtype=np.float32,
+                         buffer=memory.buf, offset=parameters * 8)
+
+    return written, samples
+
+
+def plot(name: str, parameters: int, capacity: int, FPS: int, label: str, width: int, height: int, commands):
+    """Entry point of the plotting process."""
+    import queue
+    import matplotlib.pyplot as plt
+
+    memory = shared_memory.SharedMemory(name=name)
+    written, samples = rings(memory, parameters, capacity)
+
+    figure, axes = plt.subplots(figsize=(width / 100, height / 100), dpi=100)
+    figure.canvas.manager.set_window_title(label)
+    axes.set_title(label)
+    axes.set_xlabel("seconds")
+
+    lines = {}
+    state = {"auto_zoom": True, "visible": capacity,
+             "background": None, "closed": False}
+    axes.set_xlim(-capacity / FPS, 0)
+    times = (np.arange(capacity) - capacity + 1) / FPS
+
+    def redraw():
+        figure.canvas.draw()
+        state["background"] = figure.canvas.copy_from_bbox(figure.bbox)
+
+    def handle(command):
+        if command[0] == "add":
+            _, index, parameter, color = command
+            lines[index], = axes.plot([], [], color=color, label=parameter, animated=True)
+            axes.legend(loc="upper left")
+        elif command[0] == "limits":
+            _, state["auto_zoom"], low, high = command
+            if not state["auto_zoom"]:
+                axes.set_ylim(low, high)
+        elif command[0] == "duration":
+            state["visible"] = command[1]
+            axes.set_xlim(-state["visible"] / FPS, 0)
+        elif command[0] == "close":
+            state["closed"] = True
+
+    def update():
+        changed = False
+        while True:
+            try:
+                command = commands.get_nowait()
+            except queue.Empty:
+                break
+            handle(command)
+            changed = True
+        if state["closed"]:
+            plt.close(figure)
+            return
+
+        visible = state["visible"]
+        low = high = None
+        for index, line in lines.items():
+            count = int(written[index])
+            shown = min(count, visible)
+            if shown == 0:
+                continue
+
+            # Unroll the ring so the newest sample is last
+            positions = np.arange(count - shown, count) % capacity
+            values = samples[index, positions]
+            line.set_data(times[-shown:], values)
+            if state["auto_zoom"]:
+                low = values.min() if low is None else min(low, values.min())
+                high = values.max() if high is None else max(high, values.max())
+
+        # Rescale when the data leaves the axis or shrinks to under half of it, not on every sample
+        if state["auto_zoom"] and low is not None:
+            bottom, top = axes.get_ylim()
+            if low < bottom or high > top or (high - low) < (top - bottom) / 2:
+                margin = (high - low) * 0.1 or 1
+                axes.set_ylim(low - margin, high + margin)
+                changed = True
+
+        # Only axis changes need a full redraw, every other frame restores the background and blits the lines
+        if changed or state["background"] is None:
+            redraw()
+        figure.canvas.restore_region(state["background"])
+        for line in lines.values():
+            axes.draw_artist(line)
+        figure.canvas.blit(figure.bbox)
+        figure.canvas.flush_events()
+
+    figure.canvas.mpl_connect("resize_event", lambda event: redraw())
+    timer = figure.canvas.new_timer(interval=1000 / FPS)
+    timer.add_callback(update)
+    timer.start()
+
+    try:
+        plt.show()
+    finally:
+        del written, samples
+        memory.close()
@@ -0,0 +1,40 @@
+import arcade
+import pymunk
+from typing import Dict, List, Tuple
+
+
+class Overlay:
+    """Collects a frame's lines and sprite lists and draws them in as few calls as possible.
+
+    Lines are grouped by color and width and each group is drawn with a
+    single arcade.draw_lines call. Line groups are cleared after every draw,
+    sprite lists stay registered.
+    """
+
+    def __init__(self) -> None:
+        self.sprite_lists: List[arcade.SpriteList] = []
+        self.lines: Dict[Tuple[arcade.Color, float], List[Tuple[float, float]]] = {}
+
+    def add_sprite_list(self, sprite_list: arcade.SpriteList):
+        self.sprite_lists.append(sprite_list)
+
+    def add_line(self, start_x: float, start_y: float, end_x: float, end_y: float, color: arcade.Color, line_width: float = 1):
+        points = self.lines.setdefault((tuple(color), line_width), [])
+        points.append((start_x, start_y))
+        points.append((end_x, end_y))
+
+    def add_vector(self, x: float, y: float, dx: float, dy: float, color: arcade.Color, scale: float = 1, line_width: float = 1):
+        self.add_line(x, y, x + dx * scale, y + dy * scale, color, line_width)
+
+    def add_joint(self, joint: pymunk.Constraint, color: arcade.Color = arcade.color.BLUE, line_width: float = 3):
+        self.add_line(joint.a.position.x, joint.a.position.y,
+                      joint.b.position.x, joint.b.position.y, color, line_width)
+
+    def draw(self):
+        for sprite_list in self.sprite_lists:
+            sprite_list.draw()
+
+        for (color, line_width), points in self.lines.items():
+            arcade.draw_lines(points, color, line_width)
+
+        self.lines.clear()
@@ -0,0 +1,210 @@
+import math
+import numpy as np
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+from .controls.ArmFeedforward import ArmFeedforward, Envelope
+from .controls.Trapezoidal import Constraints, State, TrapezoidProfile
+from .kinematics.DoubleJointed import DoubleJointed
+
+Joints = Tuple[float, float]
+
+
+@dataclass
+class Segment:
+    start_time: float
+    duration: float
+    arm: TrapezoidProfile
+    wrist: TrapezoidProfile
+
+
+class Plan:
+    """Synchronized arm and wrist profiles through a list of waypoints.
+
+    Both joints start and stop together at every waypoint. Wrist angles are
+    absolute, the same as Robot.wrist_target_angle.
+    """
+
+    def __init__(self, segments: List[Segment], start: Joints) -> None:
+        self.segments = segments
+        self.start = start
+        self.starts = [segment.start_time for segment in segments]
+
+    @property
+    def total_time(self) -> float:
+        if not self.segments:
+            return 0
+
+        return self.segments[-1].start_time + self.segments[-1].duration
+
+    @property
+    def goal(self) -> Joints:
+        if not self.segments:
+            return self.start
+
+        last = self.segments[-1]
+        return last.arm.calculate(last.duration).position, last.wrist.calculate(last.duration).position
+
+    def is_finished(self, t: float) -> bool:
+        return t >= self.total_time
+
+    def calculate(self, t: float) -> Tuple[State, State]:
+        if not self.segments:
+            return State(self.start[0], 0), State(self.start[1], 0)
+
+        index = max(int(np.searchsorted(self.starts, t, side="right")) - 1, 0)
+        segment = self.segments[index]
+        local = t - segment.start_time
+
+        return segment.arm.calculate(local), segment.wrist.calculate(local)
+
+    def calculate_many(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Evaluates the plan at every timestamp.
+
+        Returns:
+        arm position, arm velocity, wrist position, wrist velocity -- arrays shaped like t
+        """
+        t = np.asarray(t, dtype=float)
+        result = [np.full(t.shape, self.start[0]), np.zeros(t.shape),
+                  np.full(t.shape, self.start[1]), np.zeros(t.shape)]
+        if not self.segments:
+            return tuple(result)
+
+        indices = np.maximum(np.searchsorted(
+            self.starts, t, side="right") - 1, 0)
+        for index, segment in enumerate(self.segments):
+            mask = indices == index
+            local = t[mask] - segment.start_time
+            result[0][mask], result[1][mask] = segment.arm.calculate_many(local)
+            result[2][mask], result[3][mask] = segment.wrist.calculate_many(local)
+
+        return tuple(result)
+
+
+def minimum_time(constraints: Constraints, distance: float) -> float:
+    """Duration of a rest-to-rest trapezoid covering distance."""
+    velocity, acceleration = constraints.max_velocity, constraints.max_acceleration
+    if distance <= velocity * velocity / acceleration:
+        return 2 * math.sqrt(distance / acceleration)
+
+    return distance / velocity + velocity / acceleration
+
+
+def stretched_velocity(acceleration: float, duration: float, distance: float) -> float:
+    """Cruise velocity that makes a rest-to-rest trapezoid last exactly duration.
+
+    Solves distance = v * duration - v^2 / acceleration for the smaller root.
+    """
+    discriminant = max(acceleration * acceleration * duration * duration -
+                       4 * acceleration * distance, 0)
+
+    return (acceleration * duration - math.sqrt(discriminant)) / 2
+
+
+class Planner:
+    """Plans synchronized joint motions through Cartesian waypoints.
+
+    Waypoints are solved with one batch IK call using the same (negative)
+    solution as Robot.move_endpoint. The slower joint sets the duration of
+    every segment and the other joint's cruise velocity is lowered so both
+    finish together. With feedforwards and a max_voltage, the constraints are
+    also tightened to what the actuators can reach over the angles swept.
+
+    Keyword arguments:
+    arm_ff, wrist_ff, max_voltage -- actuator models, the envelope is skipped when any is None
+    cache_size -- plans kept for repeated requests, least recently used are dropped
+    resolution -- step the start angles are rounded to, so plans from live joint angles can be reused
+    """
+
+    def __init__(self, arm_length: float, wrist_length: float, arm_constraints: Constraints, wrist_constraints: Constraints, arm_ff: Optional[ArmFeedforward] = None, wrist_ff: Optional[ArmFeedforward] = None, max_voltage: Optional[float] = None, cache_size: int = 64, resolution: float = 1e-3) -> None:
+        self.ik = DoubleJointed(arm_length, wrist_length)
+        self.constraints = (arm_constraints, wrist_constraints)
+        self.cache_size = cache_size
+        self.resolution = resolution
+        self.cache: OrderedDict = OrderedDict()
+
+        self.envelopes: Optional[Tuple[Envelope, Envelope]] = None
+        if arm_ff is not None and wrist_ff is not None and max_voltage is not None:
+            # The absolute wrist angle can reach +/- 2 pi
+            self.envelopes = (arm_ff.envelope(max_voltage, (-2 * math.pi, 2 * math.pi), 721),
+                              wrist_ff.envelope(max_voltage, (-2 * math.pi, 2 * math.pi), 721))
+
+    def solve(self, waypoints: Sequence[Sequence[float]], start: Joints) -> np.ndarray:
+        """Returns (N + 1, 2) controlled joint angles, the start followed by every waypoint.
+
+        Raises ValueError when a waypoint is out of reach.
+        """
+        _, negative, reachable = self.ik.solve(np.asarray(waypoints, dtype=float))
+        if not np.all(reachable):
+            raise ValueError(
+                f"Waypoints {np.flatnonzero(~reachable).tolist()} are out of reach")
+
+        joints = np.empty((len(negative) + 1, 2))
+        joints[0] = start
+        joints[1:, 0] = negative[:, 0]
+        joints[1:, 1] = negative[:, 1] + negative[:, 0]
+
+        # Take the short way around instead of crossing the atan2 seam
+        return np.unwrap(joints, axis=0)
+
+    def limit(self, joint: int, low: float, high: float) -> Constraints:
+        constraints = self.constraints[joint]
+        if self.envelopes is None:
+            return constraints
+
+        envelope = self.envelopes[joint]
+        swept = (envelope.angles >= low) & (envelope.angles <= high)
+        angles = np.concatenate([[low, high], envelope.angles[swept]])
+        min_velocity, max_velocity = envelope.velocity_limits(angles)
+        min_acceleration, max_acceleration = envelope.acceleration_limits(angles)
+
+        velocity = min(constraints.max_velocity, np.min(max_velocity), np.min(-min_velocity))
+        acceleration = min(constraints.max_acceleration, np.min(max_acceleration), np.min(-min_acceleration))
+        if velocity <= 0 or acceleration <= 0:
+            raise ValueError(
+                f"Joint {joint} cannot hold or move between {low:.2f} and {high:.2f} rad")
+
+        return Constraints(float(velocity), float(acceleration))
+
+    def plan(self, waypoints: Sequence[Sequence[float]], start: Joints) -> Plan:
+        """Plans from the start joint angles through waypoints relative to the shoulder.
+
+        The plan starts from start rounded to resolution.
+        """
+        start = (round(start[0] / self.resolution) * self.resolution,
+                 round(start[1] / self.resolution) * self.resolution)
+        key = (tuple(tuple(float(value) for value in waypoint) for waypoint in waypoints),
+               start)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return self.cache[key]
+
+        joints = self.solve(waypoints, start)
+        segments: List[Segment] = []
+        start_time = 0.0
+        for begin, end in zip(joints[:-1], joints[1:]):
+            distances = np.abs(end - begin).tolist()
+            constraints = [self.limit(joint, min(begin[joint], end[joint]), max(begin[joint], end[joint]))
+                           for joint in range(2)]
+
+            duration = max(minimum_time(constraint, distance)
+                           for constraint, distance in zip(constraints, distances))
+            profiles = []
+            for joint, (constraint, distance) in enumerate(zip(constraints, distances)):
+                if duration > 0:
+                    velocity = stretched_velocity(
+                        constraint.max_acceleration, duration, distance)
+                    constraint = Constraints(
+                        max(velocity, 1e-9), constraint.max_acceleration)
+                profiles.append(TrapezoidProfile(
+                    constraint, State(float(end[joint]), 0), State(float(begin[joint]), 0)))
+
+            segments.append(Segment(start_time, duration, *profiles))
+            start_time += duration
+
+        plan = Plan(segments, (float(joints[0, 0]), float(joints[0, 1])))
+        self.cache[key] = plan
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+        return plan
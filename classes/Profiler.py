@@ -0,0 +1,115 @@
+import json
+import time
+import arcade
+import numpy as np
+from typing import Dict, Optional, Sequence
+from ._Graph import Graph
+
+COLORS = [arcade.color.RED, arcade.color.GREEN, arcade.color.BLUE, arcade.color.YELLOW,
+          arcade.color.ORANGE, arcade.color.PINK, arcade.color.CYAN, arcade.color.WHITE]
+
+
+class Timings:
+    """Fixed-size ring of the latest durations of one phase, in seconds."""
+
+    def __init__(self, capacity: int) -> None:
+        self.samples = np.zeros(capacity)
+        self.head = 0
+        self.count = 0
+        self.last = 0.0
+
+    def add(self, seconds: float):
+        self.samples[self.head] = seconds
+        self.head = (self.head + 1) % len(self.samples)
+        self.count = min(self.count + 1, len(self.samples))
+        self.last = seconds
+
+    def percentiles(self, percents: Sequence[float]) -> np.ndarray:
+        if self.count == 0:
+            return np.zeros(len(percents))
+
+        return np.percentile(self.samples[:self.count], percents)
+
+
+class Scope:
+    __slots__ = ("timings", "start")
+
+    def __init__(self, timings: Timings) -> None:
+        self.timings = timings
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        self.timings.add(time.perf_counter() - self.start)
+
+
+class NullScope:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+NULL_SCOPE = NullScope()
+
+
+class Profiler:
+    """Scoped timers for the update and draw phases.
+
+    While disabled, scope() hands out one shared no-op context manager, so
+    instrumented code only pays for the call.
+    """
+
+    def __init__(self, enabled: bool = False, capacity: int = 600) -> None:
+        self.enabled = enabled
+        self.capacity = capacity
+        self.timings: Dict[str, Timings] = {}
+        self.scopes: Dict[str, Scope] = {}
+        self.graph: Optional[Graph] = None
+
+    def scope(self, name: str):
+        if not self.enabled:
+            return NULL_SCOPE
+
+        scope = self.scopes.get(name)
+        if scope is None:
+            self.timings[name] = Timings(self.capacity)
+            scope = self.scopes[name] = Scope(self.timings[name])
+
+        return scope
+
+    def summary(self, percents: Sequence[float] = (50, 90, 99)) -> Dict[str, Dict[str, float]]:
+        """Returns the given percentiles of every phase, in milliseconds."""
+        return {name: {f"p{percent:g}": float(value) * 1000 for percent, value in zip(percents, timings.percentiles(percents))}
+                for name, timings in self.timings.items()}
+
+    def export(self, path: str):
+        with open(path, "w") as file:
+            json.dump({"summary": self.summary(),
+                       "samples": {name: (timings.samples[:timings.count] * 1000).tolist()
+                                   for name, timings in self.timings.items()}}, file, indent=2)
+
+    def draw_overlay(self, center_x: int = 300, center_y: int = 290, width: int = 600, height: int = 160):
+        if self.graph is None:
+            self.graph = Graph(center_x, center_y, width, height, "frame ms")
+            self.graph.set_min(0)
+            self.graph.auto_zoom = True
+
+        for name, timings in self.timings.items():
+            if name not in self.graph.parameters:
+                self.graph.add_parameter(
+                    name, COLORS[len(self.graph.parameters) % len(COLORS)])
+            self.graph.append_data(name, timings.last * 1000)
+
+        self.graph.label = "p90 ms  " + "  ".join(f"{name} {values['p90']:.1f}"
+                                                  for name, values in self.summary((90,)).items())
+        self.graph.draw()
+
+
+profiler = Profiler()
@@ -0,0 +1,208 @@
+import json
+import mmap
+import struct
+import numpy as np
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+MAGIC = b"KRIOSLOG"
+VERSION = 2
+# Version 1 logs from SimulationRecorder lack the wrist_ff column, the file
+# layout is otherwise the same so they are still read
+VERSIONS = (1, 2)
+
+# File layout:
+#   MAGIC | u32 version | u32 header size | JSON header {"columns": [[name, dtype], ...]}
+#   then any number of chunks, each one
+#   u32 row count | every column's values for those rows, back to back
+FILE_HEADER = struct.Struct("<II")
+CHUNK_HEADER = struct.Struct("<I")
+
+BODY_FIELDS = ("x", "y", "angle", "vx", "vy", "angular_velocity")
+
+
+class Recorder:
+    """Append-only columnar log, written in chunks of typed NumPy columns."""
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, str]], chunk_rows: int = 4096) -> None:
+        self.path = path
+        self.columns = [(name, np.dtype(dtype)) for name, dtype in columns]
+        self.chunk_rows = chunk_rows
+        self.buffers = [np.zeros(chunk_rows, dtype=dtype)
+                        for _, dtype in self.columns]
+        self.rows = 0
+
+        header = json.dumps(
+            {"columns": [[name, dtype.str] for name, dtype in self.columns]}).encode()
+        self.file = open(path, "wb")
+        self.file.write(MAGIC)
+        self.file.write(FILE_HEADER.pack(VERSION, len(header)))
+        self.file.write(header)
+
+    def append(self, row: Sequence[float]):
+        for buffer, value in zip(self.buffers, row):
+            buffer[self.rows] = value
+
+        self.rows += 1
+        if self.rows == self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        if self.rows == 0:
+            return
+
+        self.file.write(CHUNK_HEADER.pack(self.rows))
+        for buffer in self.buffers:
+            self.file.write(buffer[:self.rows].tobytes())
+        self.file.flush()
+        self.rows = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LogReader:
+    """Memory-maps a Recorder log, columns are returned as views where possible."""
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if self.map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a recorder log")
+
+        offset = len(MAGIC)
+        version, header_size = FILE_HEADER.unpack_from(self.map, offset)
+        if version not in VERSIONS:
+            raise ValueError(f"Unsupported log version {version}")
+        self.version = version
+
+        offset += FILE_HEADER.size
+        header = json.loads(bytes(self.map[offset:offset + header_size]))
+        offset += header_size
+
+        self.columns = [(name, np.dtype(dtype))
+                        for name, dtype in header["columns"]]
+        self.names = [name for name, _ in self.columns]
+        row_size = sum(dtype.itemsize for _, dtype in self.columns)
+
+        # (offset of first column, rows) for every complete chunk, a chunk cut
+        # short by a crash is ignored
+        self.chunks: List[Tuple[int, int]] = []
+        while offset + CHUNK_HEADER.size <= len(self.map):
+            rows, = CHUNK_HEADER.unpack_from(self.map, offset)
+            offset += CHUNK_HEADER.size
+            if offset + rows * row_size > len(self.map):
+                break
+            self.chunks.append((offset, rows))
+            offset += rows * row_size
+
+        self.starts = np.cumsum([0] + [rows for _, rows in self.chunks])
+
+    def __len__(self):
+        return int(self.starts[-1])
+
+    def __chunk_column(self, chunk: int, column: int) -> np.ndarray:
+        offset, rows = self.chunks[chunk]
+        for _, dtype in self.columns[:column]:
+            offset += dtype.itemsize * rows
+
+        return np.frombuffer(self.map, dtype=self.columns[column][1], count=rows, offset=offset)
+
+    def column(self, name: str) -> np.ndarray:
+        column = self.names.index(name)
+        parts = [self.__chunk_column(chunk, column)
+                 for chunk in range(len(self.chunks))]
+        if len(parts) == 1:
+            return parts[0]
+
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=self.columns[column][1])
+
+    def iter_chunks(self) -> Iterator[Dict[str, np.ndarray]]:
+        for chunk in range(len(self.chunks)):
+            yield {name: self.__chunk_column(chunk, column) for column, name in enumerate(self.names)}
+
+    def row(self, index: int) -> Dict[str, float]:
+        chunk = int(np.searchsorted(self.starts, index, side="right")) - 1
+        local = index - int(self.starts[chunk])
+
+        return {name: self.__chunk_column(chunk, column)[local].item() for column, name in enumerate(self.names)}
+
+    def close(self):
+        self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class SimulationRecorder(Recorder):
+    """Records the robot of a Simulation after every step."""
+
+    def __init__(self, simulation, path: str, chunk_rows: int = 4096) -> None:
+        self.simulation = simulation
+        self.bodies = [physics_object.body for physics_object in simulation.robot.physics_objects]
+
+        columns = [("time", "f8")]
+        for index in range(len(self.bodies)):
+            columns += [(f"body{index}_{field}", "f4") for field in BODY_FIELDS]
+        columns += [(name, "f4") for name in ("arm_angle", "wrist_angle", "arm_pid", "arm_ff",
+                                              "wrist_pid", "wrist_ff", "arm_setpoint", "arm_setpoint_velocity", "wrist_setpoint")]
+
+        super().__init__(path, columns, chunk_rows)
+
+    def record(self):
+        robot = self.simulation.robot
+        row = [self.simulation.time]
+        for body in self.bodies:
+            row += [body.position.x, body.position.y, body.angle,
+                    body.velocity.x, body.velocity.y, body.angular_velocity]
+        row += [robot.arm_body.body.angle, robot.wrist_body.body.angle, robot.arm_pid_output, robot.arm_ff_output,
+                robot.wrist_pid_output, robot.wrist_ff_output, robot.arm_target_angle, robot.setpoint_velocity, robot.wrist_target_angle]
+
+        self.append(row)
+
+
+class Replay:
+    """Poses a Simulation's robot from a recorded log instead of simulating it."""
+
+    def __init__(self, reader: LogReader, simulation) -> None:
+        self.reader = reader
+        self.simulation = simulation
+        self.bodies = [physics_object.body for physics_object in simulation.robot.physics_objects]
+        self.frame = 0
+
+    def __len__(self):
+        return len(self.reader)
+
+    def apply(self, index: int):
+        row = self.reader.row(index)
+        for body_index, body in enumerate(self.bodies):
+            prefix = f"body{body_index}_"
+            body.position = (row[prefix + "x"], row[prefix + "y"])
+            body.angle = row[prefix + "angle"]
+            body.velocity = (row[prefix + "vx"], row[prefix + "vy"])
+            body.angular_velocity = row[prefix + "angular_velocity"]
+
+        self.simulation.robot.arm_target_angle = row["arm_setpoint"]
+        self.simulation.robot.wrist_target_angle = row["wrist_setpoint"]
+        self.simulation.clock.time = row["time"]
+        self.simulation.physics_engine.resync_sprites()
+
+    def next(self) -> bool:
+        if self.frame >= len(self):
+            return False
+
+        self.apply(self.frame)
+        self.frame += 1
+
+        return True
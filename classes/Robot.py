@@ -1,33 +1,79 @@
 import pymunk
 import arcade
 import math
+import copy
+from dataclasses import dataclass
 from .kinematics.DoubleJointed import DoubleJointed
-from .controls import ArmFeedforward
+from .kinematics.IKTable import IKTable
+from .controls import ArmFeedforward, PID
 from ._Graph import Graph
-from .controls.Trapezoidal import TrapezoidProfile
-from typing import Optional
-from PID_Py.PID import PID
-from .Timer import Timer
+from .controls.Trapezoidal import Constraints, State, TrapezoidProfile
+from .controls.ProfileManager import ProfileManager
+from .Planner import Plan, Planner
+from typing import Optional, List
+from .Timer import Timer, Clock, WallClock
+from .Gains import Gains
+from .Geometry import Geometry
+from .Profiler import profiler
+
+
+@dataclass
+class RobotState:
+    arm_pid: PID
+    wrist_pid: PID
+    arm_ff: ArmFeedforward
+    wrist_ff: ArmFeedforward
+    motion: Optional[TrapezoidProfile]
+    timer_start: Optional[float]
+    arm_target_angle: float
+    wrist_target_angle: float
+    arm_output: float
+    wrist_output: float
+    plan: Optional[Plan] = None
 
 
 class Robot:
-    def __init__(self, physics_engine: arcade.PymunkPhysicsEngine, chassis_width=150, wheel_radius=10, offset=pymunk.Vec2d(0, 0)) -> None:
+    """Two-jointed arm on a wheeled chassis.
+
+    Keyword arguments:
+    geometry -- sizes, masses and motor settings of the bodies
+    chassis_width, wheel_radius -- only used when no geometry is given
+    """
+
+    def __init__(self, physics_engine: arcade.PymunkPhysicsEngine, chassis_width=150, wheel_radius=10, offset=pymunk.Vec2d(0, 0), clock: Clock = None, gains: Gains = None, sprite_list: arcade.SpriteList = None, ik_table: IKTable = None, geometry: Geometry = None) -> None:
         self.physics_engine = physics_engine
-        self.robot_segments = arcade.SpriteList()
-        self.chassis_width = chassis_width
+        self.geometry = geometry if geometry is not None else Geometry(
+            chassis_width=chassis_width, wheel_radius=wheel_radius)
+        self.clock = clock if clock is not None else WallClock()
+        self.robot_segments = sprite_list if sprite_list is not None else arcade.SpriteList()
+        self.physics_objects: List[arcade.PymunkPhysicsObject] = []
+        self.chassis_width = self.geometry.chassis_width
         self.offset = offset
-        self.wheel_radius = wheel_radius
-        self.arm_length = 150
-        self.wrist_length = 40
+        self.wheel_radius = self.geometry.wheel_radius
+        self.arm_length = self.geometry.arm_length
+        self.wrist_length = self.geometry.wrist_length
         self.ik = DoubleJointed(self.arm_length, self.wrist_length)
+        self.ik_table = ik_table
+        self.gains = gains if gains is not None else Gains()
 
-        self.arm_pid = PID(50000, 1000, 30000, indirectAction=False)
-        self.arm_ff = ArmFeedforward(0, 65000, 0, 0)
+        self.arm_pid = PID(self.gains.arm_kp, self.gains.arm_ki,
+                           self.gains.arm_kd)
+        self.arm_ff = ArmFeedforward(
+            self.gains.arm_s, self.gains.arm_g, self.gains.arm_v, self.gains.arm_a)
         self.arm_target_angle = 0
-
-        self.wrist_pid = PID(70000, 10000, 2000)
-        self.wrist_ff = ArmFeedforward(0, 0, 0, 0)
+        self.arm_output = 0
+        self.arm_pid_output = 0
+        self.arm_ff_output = 0
+        self.setpoint_velocity = 0
+
+        self.wrist_pid = PID(
+            self.gains.wrist_kp, self.gains.wrist_ki, self.gains.wrist_kd)
+        self.wrist_ff = ArmFeedforward(
+            self.gains.wrist_s, self.gains.wrist_g, self.gains.wrist_v, self.gains.wrist_a)
         self.wrist_target_angle = 0
+        self.wrist_output = 0
+        self.wrist_pid_output = 0
+        self.wrist_ff_output = 0
 
         self.graph = Graph(300, 500, 600, 200, "arm PID")
         self.graph.set_max(2)
@@ -37,7 +83,11 @@ class Robot:
         self.graph.add_parameter("Speed", arcade.color.PINK)
 
         self.motion: TrapezoidProfile = None
-        self.timer = Timer()
+        self.plan: Optional[Plan] = None
+        self.profiles = ProfileManager()
+        self.planner = Planner(self.arm_length, self.wrist_length,
+                               Constraints(2, 1), Constraints(4, 2))
+        self.timer = Timer(self.clock)
 
         self.arm_body: Optional[arcade.PymunkPhysicsObject] = None
         self.wrist_body: Optional[arcade.PymunkPhysicsObject] = None
@@ -46,46 +96,121 @@ class Robot:
         self.setup()
 
     def on_update(self):
+        with profiler.scope("control"):
+            self.update_controller()
+            self.apply_outputs()
+
+        with profiler.scope("graph"):
+            self.sample_graph()
+
+    def update_controller(self):
         vel = 0
-        if self.motion is not None:
+        if self.plan is not None:
+            arm, wrist = self.plan.calculate(self.timer.get_delta_sec())
+            self.arm_target_angle = arm.position
+            self.wrist_target_angle = wrist.position
+            vel = arm.velocity
+        elif self.motion is not None:
             result = self.motion.calculate(
                 self.timer.get_delta_sec())
             self.arm_target_angle = result.position
             vel = result.velocity
 
-        pid_output = self.arm_pid.compute(
-            self.arm_target_angle, self.arm_body.body.angle)
-        ff_output = self.arm_ff.calculate(self.arm_body.body.angle, 0)
+        self.setpoint_velocity = vel
 
-        self.arm_body.body.apply_force_at_local_point(
-            (0, ff_output + pid_output), (self.arm_length / 2, 0))
+        now = self.clock.now()
+        self.arm_pid_output = self.arm_pid.compute(
+            self.arm_target_angle, self.arm_body.body.angle, now)
+        self.arm_ff_output = self.arm_ff.calculate(
+            self.arm_body.body.angle, 0)
 
-        self.graph.append_data("Target", self.arm_target_angle)
-        self.graph.append_data("Actual", self.arm_body.body.angle)
-        self.graph.append_data("Speed", vel)
+        self.arm_output = self.arm_ff_output + self.arm_pid_output
 
-        # ff_output = self.wrist_ff.calculate()
-        pid_output = self.wrist_pid.compute(
-            self.wrist_target_angle, self.wrist_body.body.angle)
+        self.wrist_pid_output = self.wrist_pid.compute(
+            self.wrist_target_angle, self.wrist_body.body.angle, now)
+        self.wrist_ff_output = self.wrist_ff.calculate(
+            self.wrist_body.body.angle, 0)
 
-        self.wrist_body.body.apply_force_at_local_point(
-            (0, pid_output), (self.wrist_length / 2, 0))
+        self.wrist_output = self.wrist_ff_output + self.wrist_pid_output
 
         # print(pid_output)
 
+    def apply_outputs(self):
+        self.arm_body.body.apply_force_at_local_point(
+            (0, self.arm_output), (self.arm_length / 2, 0))
+        self.wrist_body.body.apply_force_at_local_point(
+            (0, self.wrist_output), (self.wrist_length / 2, 0))
+
+    def sample_graph(self):
+        self.graph.append_data("Target", self.arm_target_angle)
+        self.graph.append_data("Actual", self.arm_body.body.angle)
+        self.graph.append_data("Speed", self.setpoint_velocity)
+
+    def get_state(self) -> RobotState:
+        return RobotState(copy.deepcopy(self.arm_pid), copy.deepcopy(self.wrist_pid),
+                          copy.deepcopy(self.arm_ff), copy.deepcopy(
+                              self.wrist_ff),
+                          self.motion, self.timer.start_time,
+                          self.arm_target_angle, self.wrist_target_angle,
+                          self.arm_output, self.wrist_output, self.plan)
+
+    def set_state(self, state: RobotState):
+        # Copy again so the same state can be restored any number of times
+        self.arm_pid = copy.deepcopy(state.arm_pid)
+        self.wrist_pid = copy.deepcopy(state.wrist_pid)
+        self.arm_ff = copy.deepcopy(state.arm_ff)
+        self.wrist_ff = copy.deepcopy(state.wrist_ff)
+        self.motion = state.motion
+        self.plan = state.plan
+        self.timer.start_time = state.timer_start
+        self.arm_target_angle = state.arm_target_angle
+        self.wrist_target_angle = state.wrist_target_angle
+        self.arm_output = state.arm_output
+        self.wrist_output = state.wrist_output
+
     def setup(self):
         self.create_chassis()
         self.move_endpoint(pymunk.Vec2d(190, 0))
 
     def move_endpoint(self, position: pymunk.Vec2d):
         self.ik.position = position
-        results = self.ik.calculate_angles()
+        if self.ik_table is not None:
+            results = self.ik_table.lookup(position)
+        else:
+            results = self.ik.calculate_angles()
         if results is None:
             return
 
         self.arm_target_angle = results[1][0]
         self.wrist_target_angle = results[1][1] + results[1][0]
 
+    def move_arm_to(self, goal: State, constraints: Constraints):
+        """Moves the arm joint along a trapezoid profile, replanning only when the goal or constraints change.
+
+        A plan being followed is dropped and the profile starts from the current arm angle.
+        """
+        t = self.timer.get_delta_sec() if self.motion is not None else 0
+        motion = self.profiles.replan(self.motion, t, constraints, goal, State(
+            self.arm_body.body.angle, 0))
+        if motion is not self.motion:
+            self.motion = motion
+            self.plan = None
+            self.timer.start()
+
+    def follow(self, plan: Plan):
+        # The timer restarts for the plan, so the old profile's time no longer applies
+        self.plan = plan
+        self.motion = None
+        self.timer.start()
+
+    def move_along(self, waypoints: List[pymunk.Vec2d]) -> Plan:
+        """Plans from the current joint angles through endpoint waypoints and follows the plan."""
+        plan = self.planner.plan([(point.x, point.y) for point in waypoints],
+                                 (self.arm_body.body.angle, self.wrist_body.body.angle))
+        self.follow(plan)
+
+        return plan
+
     def create_point(self, x, y):
         body = pymunk.Body()
         body.position = (x, y)
@@ -100,8 +225,10 @@ class Robot:
 
         self.robot_segments.append(sprite)
         self.physics_engine.add_sprite(sprite, mass, 1, 0)
+        physics_object = self.physics_engine.get_physics_object(sprite)
+        self.physics_objects.append(physics_object)
 
-        return sprite, self.physics_engine.get_physics_object(sprite)
+        return sprite, physics_object
 
     def create_wheel(self, position: tuple, radius: int, color: arcade.Color, mass: int):
         sprite = arcade.SpriteCircle(radius, color)
@@ -109,41 +236,44 @@ class Robot:
 
         self.robot_segments.append(sprite)
         self.physics_engine.add_sprite(sprite, mass, 0.9)
+        physics_object = self.physics_engine.get_physics_object(sprite)
+        self.physics_objects.append(physics_object)
 
-        return sprite, self.physics_engine.get_physics_object(sprite)
+        return sprite, physics_object
 
     def create_chassis(self):
+        geometry = self.geometry
 
         left_wheel, left_wheel_object = self.create_wheel(
-            (self.offset.x + self.wheel_radius, self.offset.y), self.wheel_radius, arcade.color.ALMOND, 1)
+            (self.offset.x + self.wheel_radius, self.offset.y), self.wheel_radius, arcade.color.ALMOND, geometry.wheel_mass)
 
         right_wheel, right_wheel_object = self.create_wheel(
-            (self.offset.x + self.chassis_width - self.wheel_radius, self.offset.y), self.wheel_radius, arcade.color.ALMOND, 1)
+            (self.offset.x + self.chassis_width - self.wheel_radius, self.offset.y), self.wheel_radius, arcade.color.ALMOND, geometry.wheel_mass)
 
         chassis, chassis_object = self.create_robot_segment(
-            (self.offset.x + self.chassis_width / 2, self.offset.y + 10), self.chassis_width, 20, arcade.color.ASH_GREY, 50)
+            (self.offset.x + self.chassis_width / 2, self.offset.y + geometry.chassis_height / 2), self.chassis_width, geometry.chassis_height, arcade.color.ASH_GREY, geometry.chassis_mass)
         structure, structure_object = self.create_robot_segment(
-            (self.offset.x + self.chassis_width / 2, self.offset.y + 20 + 70), 20, 140, arcade.color.ASH_GREY, 20)
+            (self.offset.x + self.chassis_width / 2, self.offset.y + geometry.chassis_height + geometry.structure_height / 2), geometry.structure_width, geometry.structure_height, arcade.color.ASH_GREY, geometry.structure_mass)
 
         left_wheel_joint = pymunk.PivotJoint(
-            chassis_object.body, left_wheel_object.body, (-self.chassis_width / 2 + self.wheel_radius, -20), (0, 0))
+            chassis_object.body, left_wheel_object.body, (-self.chassis_width / 2 + self.wheel_radius, -geometry.chassis_height), (0, 0))
         left_wheel_joint.collide_bodies = False
 
         right_wheel_joint = pymunk.PivotJoint(
-            chassis_object.body, right_wheel_object.body, (self.chassis_width / 2 - self.wheel_radius, -20), (0, 0))
+            chassis_object.body, right_wheel_object.body, (self.chassis_width / 2 - self.wheel_radius, -geometry.chassis_height), (0, 0))
         right_wheel_joint.collide_bodies = False
 
         structure_joint = pymunk.PivotJoint(
-            chassis_object.body, structure_object.body, (0, 10), (0, -70))
+            chassis_object.body, structure_object.body, (0, geometry.chassis_height / 2), (0, -geometry.structure_height / 2))
         structure_gear_joint = pymunk.GearJoint(
             chassis_object.body, structure_object.body, 0, 1)
         structure_joint.collide_bodies = False
         structure_gear_joint.collide_bodies = False
 
         left_motor = pymunk.SimpleMotor(
-            chassis_object.body, left_wheel_object.body, 0)
+            chassis_object.body, left_wheel_object.body, geometry.wheel_motor_rate)
         right_motor = pymunk.SimpleMotor(
-            chassis_object.body, right_wheel_object.body, 0)
+            chassis_object.body, right_wheel_object.body, geometry.wheel_motor_rate)
 
         self.physics_engine.space.add(
             structure_joint, left_wheel_joint, left_motor, right_wheel_joint, right_motor, structure_gear_joint)
@@ -151,19 +281,20 @@ class Robot:
         self.create_arm(structure, structure_object)
 
     def create_arm(self, structure: arcade.SpriteSolidColor, structure_object: arcade.PymunkPhysicsObject):
+        geometry = self.geometry
 
         shoulder, shoulder_body = self.create_robot_segment(
-            (structure.position[0] + self.arm_length / 2, structure.position[1] + structure.height / 2), self.arm_length, 20, arcade.color.CRIMSON, 10)
+            (structure.position[0] + self.arm_length / 2, structure.position[1] + structure.height / 2), self.arm_length, geometry.arm_width, arcade.color.CRIMSON, geometry.arm_mass)
 
         wrist, wrist_body = self.create_robot_segment(
-            (shoulder.position[0] + self.arm_length / 2 + self.wrist_length / 2, shoulder.position[1]), self.wrist_length, 10, arcade.color.AMAZON, 3)
+            (shoulder.position[0] + self.arm_length / 2 + self.wrist_length / 2, shoulder.position[1]), self.wrist_length, geometry.wrist_width, arcade.color.AMAZON, geometry.wrist_mass)
 
         shoulder_pivot_joint = pymunk.PinJoint(
             structure_object.body, shoulder_body.body, (0, structure.height / 2), (-self.arm_length / 2, 0))
         shoulder_pivot_joint.collide_bodies = False
         shoulder_motor = pymunk.SimpleMotor(
-            structure_object.body, shoulder_body.body, 0)
-        shoulder_motor.max_force = 3000000
+            structure_object.body, shoulder_body.body, geometry.shoulder_motor_rate)
+        shoulder_motor.max_force = geometry.shoulder_motor_max_force
 
         wrist_pivot_joint = pymunk.PinJoint(
             shoulder_body.body, wrist_body.body, (self.arm_length / 2, 0), (-self.wrist_length / 2, 0))
@@ -171,7 +302,7 @@ class Robot:
         wrist_pivot_joint.collide_bodies = False
 
         wrist_motor = pymunk.SimpleMotor(
-            shoulder_body.body, wrist_body.body, 0)
+            shoulder_body.body, wrist_body.body, geometry.wrist_motor_rate)
 
         self.physics_engine.space.add(
             shoulder_pivot_joint, wrist_pivot_joint)
@@ -0,0 +1,217 @@
+import hashlib
+import json
+import marshal
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+import arcade
+import pymunk
+from .Gains import Gains
+from .Geometry import Geometry
+from .Simulation import Simulation
+
+VERSION = 1
+
+Color = Tuple[int, ...]
+
+
+@dataclass
+class WallSpec:
+    position: Tuple[float, float]
+    size: Tuple[float, float]
+    elasticity: float = 0.4
+    friction: float = 0.5
+    color: Color = arcade.color.BLACK
+
+
+@dataclass
+class BallSpec:
+    position: Tuple[float, float]
+    radius: float = 20
+    mass: float = 10
+    elasticity: float = 0.9
+    friction: float = 0.4
+    color: Color = arcade.color.CRIMSON
+    static: bool = False
+
+
+@dataclass
+class RobotSpec:
+    offset: Tuple[float, float] = (200, 100)
+    # None leaves the choice to Simulation, which holds scheduled robots with Gains.held()
+    gains: Optional[Gains] = None
+    geometry: Geometry = field(default_factory=Geometry)
+
+
+@dataclass
+class SceneSpec:
+    """Declarative description of a scene, see load() for the file format."""
+    width: int = 800
+    height: int = 608
+    gravity: Tuple[float, float] = (0, -980)
+    boundary_offset: Optional[int] = 10
+    robots: List[RobotSpec] = field(default_factory=lambda: [RobotSpec()])
+    walls: List[WallSpec] = field(default_factory=list)
+    balls: List[BallSpec] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SceneSpec":
+        data = dict(data)
+        version = data.pop("version", VERSION)
+        if version != VERSION:
+            raise ValueError(f"Unsupported scene version {version}")
+
+        if "gravity" in data:
+            data["gravity"] = tuple(data["gravity"])
+        if "robots" in data:
+            data["robots"] = [RobotSpec(tuple(robot.get("offset", (200, 100))),
+                                        Gains(**robot["gains"]) if robot.get("gains") else None,
+                                        Geometry(**robot.get("geometry", {})))
+                              for robot in data["robots"]]
+        if "walls" in data:
+            data["walls"] = [WallSpec(**_tuples(wall)) for wall in data["walls"]]
+        if "balls" in data:
+            data["balls"] = [BallSpec(**_tuples(ball)) for ball in data["balls"]]
+
+        return cls(**data)
+
+
+def _tuples(values: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: tuple(value) if isinstance(value, list) else value for name, value in values.items()}
+
+
+def read(path: str) -> Dict[str, Any]:
+    """Reads a JSON or, by its .toml extension, a TOML scene file into plain containers."""
+    with open(path, "rb") as file:
+        if path.endswith(".toml"):
+            import tomllib
+            return tomllib.load(file)
+
+        return json.load(file)
+
+
+def parse(path: str) -> SceneSpec:
+    return SceneSpec.from_dict(read(path))
+
+
+def load(path: str, cache_dir: Optional[str] = None) -> SceneSpec:
+    """Parses a scene file, reusing the contents read into cache_dir while the file is unchanged.
+
+    The file holds a "version" and any SceneSpec field: "width", "height",
+    "gravity", "boundary_offset" (null for no boundary walls), and lists of
+    "robots" ({"offset", "gains", "geometry"}, see Gains and Geometry, empty
+    gains take the defaults for the control mode),
+    "walls" ({"position", "size", ...}) and "balls" ({"position", "radius",
+    "mass", ...}). The first robot is the simulation's robot, the others are
+    controlled together as a Fleet. The window is sized to width and height.
+
+    The cache holds the file's plain dicts and lists written with marshal,
+    which cannot run code when loaded, and SceneSpec is rebuilt from them.
+    """
+    if cache_dir is None:
+        return parse(path)
+
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size, marshal.version)
+    name = hashlib.sha1(os.path.abspath(path).encode()).hexdigest()
+    cache_path = os.path.join(cache_dir, f"scene_{name}.marshal")
+
+    try:
+        with open(cache_path, "rb") as file:
+            cached_stamp, data = marshal.load(file)
+        if cached_stamp == stamp:
+            return SceneSpec.from_dict(data)
+    except (OSError, EOFError, ValueError, TypeError):
+        # Missing, truncated or foreign caches are only a miss, anything
+        # else is a bug and is raised
+        pass
+
+    data = read(path)
+    scene = SceneSpec.from_dict(data)
+
+    # Write to a temporary file first so readers never see a partial cache
+    os.makedirs(cache_dir, exist_ok=True)
+    temporary = f"{cache_path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as file:
+        marshal.dump((stamp, data), file)
+    os.replace(temporary, cache_path)
+
+    return scene
+
+
+def add_bodies(physics_engine: arcade.PymunkPhysicsEngine, walls: List[WallSpec], balls: List[BallSpec]) -> Tuple[List[arcade.Sprite], List[arcade.Sprite]]:
+    """Creates every wall and ball with a single space.add() instead of one add_sprite() each.
+
+    Returns the wall sprites and the ball sprites.
+    """
+    if "default" not in physics_engine.collision_types:
+        physics_engine.collision_types.append("default")
+    collision_type = physics_engine.collision_types.index("default")
+
+    items = []
+    wall_sprites = []
+    ball_sprites = []
+    for wall in walls:
+        sprite = arcade.SpriteSolidColor(
+            int(wall.size[0]), int(wall.size[1]), wall.color)
+        sprite.position = wall.position
+
+        body = pymunk.Body(body_type=pymunk.Body.STATIC)
+        body.position = wall.position
+        shape = pymunk.Poly.create_box(body, wall.size)
+        _register(physics_engine, sprite, body, shape, wall.elasticity,
+                  wall.friction, collision_type)
+        items += [body, shape]
+        wall_sprites.append(sprite)
+
+    for ball in balls:
+        sprite = arcade.SpriteCircle(int(ball.radius), ball.color)
+        sprite.position = ball.position
+
+        if ball.static:
+            body = pymunk.Body(body_type=pymunk.Body.STATIC)
+        else:
+            body = pymunk.Body(ball.mass, pymunk.moment_for_circle(
+                ball.mass, 0, ball.radius))
+            physics_engine.non_static_sprite_list.append(sprite)
+        body.position = ball.position
+        shape = pymunk.Circle(body, ball.radius)
+        _register(physics_engine, sprite, body, shape, ball.elasticity,
+                  ball.friction, collision_type)
+        items += [body, shape]
+        ball_sprites.append(sprite)
+
+    physics_engine.space.add(*items)
+
+    return wall_sprites, ball_sprites
+
+
+def _register(physics_engine: arcade.PymunkPhysicsEngine, sprite: arcade.Sprite, body: pymunk.Body, shape: pymunk.Shape, elasticity: float, friction: float, collision_type: int):
+    shape.elasticity = elasticity
+    shape.friction = friction
+    shape.collision_type = collision_type
+    physics_engine.sprites[sprite] = arcade.PymunkPhysicsObject(body, shape)
+    sprite.register_physics_engine(physics_engine)
+
+
+def build(scene: SceneSpec, **simulation_options) -> Simulation:
+    """Creates a Simulation holding everything in the scene.
+
+    Keyword arguments are passed on to Simulation, for example substeps or control_period.
+    """
+    robots = scene.robots or [RobotSpec()]
+    simulation = Simulation(scene.width, scene.height, scene.gravity, robot_offset=pymunk.Vec2d(*robots[0].offset),
+                            boundary_offset=scene.boundary_offset, gains=robots[0].gains, geometry=robots[0].geometry,
+                            **simulation_options)
+
+    walls, balls = add_bodies(simulation.physics_engine, scene.walls, scene.balls)
+    simulation.wall_list.extend(walls)
+    simulation.ball_list.extend(balls)
+    simulation.sprite_list.extend(walls + balls)
+
+    if len(robots) > 1:
+        simulation.add_fleet([pymunk.Vec2d(*robot.offset) for robot in robots[1:]],
+                             [robot.gains for robot in robots[1:]],
+                             geometries=[robot.geometry for robot in robots[1:]])
+
+    return simulation
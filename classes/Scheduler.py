@@ -0,0 +1,34 @@
+from typing import Callable, List
+
+
+class PeriodicTask:
+    def __init__(self, period: float, callback: Callable[[], None]) -> None:
+        self.period = period
+        self.callback = callback
+        self.next_time = None
+
+
+class ControlScheduler:
+    """Runs callbacks at their own fixed periods against a simulated time.
+
+    tick() is meant to be called every physics sub-step. Between runs a
+    controller's last outputs are held (zero-order hold) by whoever applies them.
+    """
+
+    def __init__(self) -> None:
+        self.tasks: List[PeriodicTask] = []
+
+    def add(self, period: float, callback: Callable[[], None]) -> PeriodicTask:
+        task = PeriodicTask(period, callback)
+        self.tasks.append(task)
+
+        return task
+
+    def tick(self, now: float):
+        for task in self.tasks:
+            # Small tolerance so float drift in the clock does not skip a period
+            if task.next_time is None or now >= task.next_time - 1e-9:
+                task.callback()
+                if task.next_time is None or now - task.next_time >= task.period:
+                    task.next_time = now
+                task.next_time += task.period
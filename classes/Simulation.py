@@ -0,0 +1,263 @@
+import math
+import arcade
+import pymunk
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from .Robot import Robot, RobotState
+from .Fleet import Fleet, isolate
+from .Gains import Gains
+from .Geometry import Geometry
+from .Timer import SimulatedClock
+from .Stepper import FixedStepper
+from .Scheduler import ControlScheduler
+from .Profiler import profiler
+
+
+@dataclass
+class Trajectory:
+    time: List[float] = field(default_factory=list)
+    arm_angle: List[float] = field(default_factory=list)
+    wrist_angle: List[float] = field(default_factory=list)
+    arm_target: List[float] = field(default_factory=list)
+    wrist_target: List[float] = field(default_factory=list)
+    arm_force: List[float] = field(default_factory=list)
+    wrist_force: List[float] = field(default_factory=list)
+
+
+@dataclass
+class Snapshot:
+    time: float
+    bodies: List[Tuple[float, ...]]
+    robot: RobotState
+    fleets: List[Dict[str, Any]]
+    schedule: List[float]
+
+
+class Simulation:
+    """Physics scene with a single robot, stepped without a window.
+
+    Keyword arguments:
+    control_period -- default controller period in simulated seconds, None runs controllers once per step
+    robot_period -- period of the robot's controller, control_period when None
+    gains -- controller gains, Gains.held() for a scheduled robot and Gains() otherwise when None
+    geometry -- sizes and masses of the robot, the default Geometry when None
+
+    A scheduled controller holds its outputs over every sub-step, so it needs
+    the held gains; these hold the arm on target at 200 Hz:
+
+        simulation = Simulation(control_period=1 / 200)
+        telemetry = simulation.run(6)
+    """
+
+    def __init__(self, width: int = 800, height: int = 608, gravity=(0, -980), robot_offset=pymunk.Vec2d(200, 100), boundary_offset: Optional[int] = 10, substeps: int = 10, gains: Gains = None, stepper: FixedStepper = None, control_period: float = None, robot_period: float = None, geometry: Geometry = None) -> None:
+        self.width = width
+        self.height = height
+        self.substeps = substeps
+        self.clock = SimulatedClock()
+        self.stepper = stepper if stepper is not None else FixedStepper(
+            substeps=substeps)
+        self.previous_poses: Dict[arcade.Sprite, Tuple[float, float, float]] = {}
+        if robot_period is None:
+            robot_period = control_period
+        if gains is None and robot_period is not None:
+            gains = Gains.held()
+
+        self.physics_engine = arcade.PymunkPhysicsEngine(gravity)
+        self.wall_list = arcade.SpriteList()
+        self.ball_list = arcade.SpriteList()
+        self.sprite_list = arcade.SpriteList()
+        self.robot = Robot(self.physics_engine, offset=robot_offset,
+                           clock=self.clock, gains=gains, sprite_list=self.sprite_list, geometry=geometry)
+        self.fleets: List[Fleet] = []
+        self.recorder = None
+        self.telemetry = None
+
+        # Controllers without a period run once per step, after the physics
+        self.control_period = control_period
+        self.scheduler = ControlScheduler()
+        self.scheduled: List[Any] = []
+        self.schedule(self.robot, robot_period)
+
+        if boundary_offset is not None:
+            self.create_boundaries(boundary_offset)
+
+    def create_boundaries(self, offset: int):
+        positions = [
+            [(self.width / 2, offset / 2), (self.width, offset)],
+            [(offset / 2, self.height / 2), (offset, self.height)],
+            [(self.width - offset / 2, self.height / 2), (offset, self.height)],
+            [(self.width / 2, self.height - offset / 2), (self.width, offset)]
+        ]
+        for pos, size in positions:
+            wall = arcade.SpriteSolidColor(
+                size[0], size[1], arcade.color.BLACK)
+            wall.position = pos
+            self.wall_list.append(wall)
+            self.sprite_list.append(wall)
+
+        self.physics_engine.add_sprite_list(
+            self.wall_list,
+            body_type=arcade.PymunkPhysicsEngine.STATIC,
+            elasticity=0.4,
+            friction=0.5
+        )
+
+    def schedule(self, controller, period: Optional[float]):
+        """Runs controller.update_controller every period inside the sub-steps, holding its outputs in between."""
+        if period is None:
+            return
+
+        self.scheduler.add(period, controller.update_controller)
+        self.scheduled.append(controller)
+
+    def add_fleet(self, offsets: Sequence[pymunk.Vec2d], gains: Sequence[Gains] = None, period: float = None, geometries: Sequence[Geometry] = None) -> Fleet:
+        """Adds robots controlled together, every period (control_period when None).
+
+        Scheduled robots default to Gains.held(), like the main robot.
+        """
+        if period is None:
+            period = self.control_period
+        if period is not None:
+            gains = list(gains) if gains is not None else [None for _ in offsets]
+            gains = [robot_gains if robot_gains is not None else Gains.held() for robot_gains in gains]
+        fleet = Fleet(self.physics_engine, offsets, gains,
+                      clock=self.clock, sprite_list=self.sprite_list, geometries=geometries)
+        self.fleets.append(fleet)
+        if fleet.isolated:
+            isolate(self.physics_engine, [self.robot])
+        self.schedule(fleet, period)
+
+        return fleet
+
+    def snapshot(self) -> Snapshot:
+        """Captures every dynamic body and all controller state.
+
+        Snapshots are picklable, so they can be restored into a Simulation
+        built with the same arguments in another process. Pymunk's cached
+        contact impulses are not exposed, so a restored run can drift from
+        the original by solver noise.
+        """
+        bodies = [(body.position.x, body.position.y, body.angle, body.velocity.x, body.velocity.y,
+                   body.angular_velocity, body.force.x, body.force.y, body.torque)
+                  for body in self.physics_engine.space.bodies if body.body_type == pymunk.Body.DYNAMIC]
+
+        return Snapshot(self.time, bodies, self.robot.get_state(), [fleet.get_state() for fleet in self.fleets],
+                        [task.next_time for task in self.scheduler.tasks])
+
+    def restore(self, snapshot: Snapshot):
+        bodies = [body for body in self.physics_engine.space.bodies
+                  if body.body_type == pymunk.Body.DYNAMIC]
+        if len(bodies) != len(snapshot.bodies) or len(self.fleets) != len(snapshot.fleets):
+            raise ValueError("Snapshot was taken from a different scene")
+
+        for body, (x, y, angle, vx, vy, angular_velocity, fx, fy, torque) in zip(bodies, snapshot.bodies):
+            body.position = (x, y)
+            body.angle = angle
+            body.velocity = (vx, vy)
+            body.angular_velocity = angular_velocity
+            body.force = (fx, fy)
+            body.torque = torque
+
+        self.clock.time = snapshot.time
+        self.robot.set_state(snapshot.robot)
+        for fleet, state in zip(self.fleets, snapshot.fleets):
+            fleet.set_state(state)
+        for task, next_time in zip(self.scheduler.tasks, snapshot.schedule):
+            task.next_time = next_time
+
+        self.physics_engine.resync_sprites()
+
+    @property
+    def time(self) -> float:
+        return self.clock.now()
+
+    def step(self, delta_time: float, substeps: int = None):
+        substeps = substeps if substeps is not None else self.substeps
+        substep = delta_time / substeps
+        with profiler.scope("physics"):
+            for _ in range(substeps):
+                if self.scheduled:
+                    with profiler.scope("control"):
+                        self.scheduler.tick(self.clock.now())
+                        for controller in self.scheduled:
+                            controller.apply_outputs()
+
+                self.physics_engine.step(substep, resync_sprites=False)
+                self.clock.advance(substep)
+            self.physics_engine.resync_sprites()
+
+        if self.robot in self.scheduled:
+            with profiler.scope("graph"):
+                self.robot.sample_graph()
+        else:
+            self.robot.on_update()
+        for fleet in self.fleets:
+            if fleet not in self.scheduled:
+                fleet.on_update()
+
+        if self.recorder is not None:
+            self.recorder.record()
+        if self.telemetry is not None:
+            self.telemetry.record()
+
+    def max_angular_speed(self) -> float:
+        return max(abs(physics_object.body.angular_velocity) for physics_object in self.robot.physics_objects)
+
+    def fixed_step(self, delta_time: float) -> int:
+        for sprite in self.physics_engine.non_static_sprite_list:
+            body = self.physics_engine.sprites[sprite].body
+            self.previous_poses[sprite] = (
+                body.position.x, body.position.y, body.angle)
+
+        substeps = self.stepper.substeps_for(self.max_angular_speed())
+        self.step(delta_time, substeps)
+
+        return substeps
+
+    def advance(self, frame_time: float) -> int:
+        """Spends a frame's time in fixed steps and interpolates the sprites.
+
+        Returns the number of fixed steps taken, see self.stepper for the
+        sub-step count.
+        """
+        steps = self.stepper.advance(frame_time, self.fixed_step)
+        self.interpolate(self.stepper.alpha)
+
+        return steps
+
+    def interpolate(self, alpha: float):
+        # Draw sprites between the last two physics states so motion stays smooth
+        for sprite in self.physics_engine.non_static_sprite_list:
+            previous = self.previous_poses.get(sprite)
+            if previous is None:
+                continue
+
+            body = self.physics_engine.sprites[sprite].body
+            x, y, angle = previous
+            sprite.position = (x + (body.position.x - x) * alpha,
+                               y + (body.position.y - y) * alpha)
+            sprite.angle = math.degrees(angle + (body.angle - angle) * alpha)
+
+    def run(self, duration: float, dt: float = 1 / 60) -> Trajectory:
+        """Steps the scene at a fixed dt as fast as possible.
+
+        Returns the joint trajectory sampled once per step.
+
+        Keyword arguments:
+        duration -- simulated time to run for, in seconds
+        dt -- time per step, in seconds
+        """
+        trajectory = Trajectory()
+        steps = round(duration / dt)
+        for _ in range(steps):
+            self.step(dt)
+
+            trajectory.time.append(self.time)
+            trajectory.arm_angle.append(self.robot.arm_body.body.angle)
+            trajectory.wrist_angle.append(self.robot.wrist_body.body.angle)
+            trajectory.arm_target.append(self.robot.arm_target_angle)
+            trajectory.wrist_target.append(self.robot.wrist_target_angle)
+            trajectory.arm_force.append(self.robot.arm_output)
+            trajectory.wrist_force.append(self.robot.wrist_output)
+
+        return trajectory
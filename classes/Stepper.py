@@ -0,0 +1,62 @@
+import math
+from typing import Callable
+
+
+class FixedStepper:
+    """Accumulates frame time and spends it in fixed physics steps.
+
+    Keyword arguments:
+    dt -- duration of one fixed step, in seconds
+    max_steps -- most steps taken in one frame, leftover time is dropped so a hitch cannot spiral
+    substeps -- physics sub-steps per fixed step when not adaptive
+    adaptive -- pick the sub-step count from how fast the joints are turning
+    min_substeps, max_substeps -- bounds for the adaptive sub-step count
+    max_angle -- largest joint rotation allowed in one adaptive sub-step, in radians
+    """
+
+    def __init__(self, dt: float = 1 / 60, max_steps: int = 5, substeps: int = 10, adaptive: bool = False, min_substeps: int = 2, max_substeps: int = 20, max_angle: float = 0.01) -> None:
+        self.dt = dt
+        self.max_steps = max_steps
+        self.substeps = substeps
+        self.adaptive = adaptive
+        self.min_substeps = min_substeps
+        self.max_substeps = max_substeps
+        self.max_angle = max_angle
+
+        self.accumulator = 0.0
+        self.alpha = 0.0
+        self.steps_taken = 0
+        self.substeps_taken = 0
+        self.dropped_steps = 0
+
+    def substeps_for(self, angular_speed: float) -> int:
+        if not self.adaptive:
+            return self.substeps
+
+        substeps = math.ceil(angular_speed * self.dt / self.max_angle)
+        return min(max(substeps, self.min_substeps), self.max_substeps)
+
+    def advance(self, frame_time: float, step: Callable[[float], int]) -> int:
+        """Runs as many fixed steps as the accumulated time allows.
+
+        step is called with dt and returns the sub-steps it used. Returns
+        the number of fixed steps taken, alpha is left at how far the
+        remaining time is into the next step for interpolated rendering.
+        """
+        self.accumulator += frame_time
+        self.steps_taken = 0
+        self.substeps_taken = 0
+
+        while self.accumulator >= self.dt and self.steps_taken < self.max_steps:
+            self.substeps_taken += step(self.dt)
+            self.accumulator -= self.dt
+            self.steps_taken += 1
+
+        if self.accumulator >= self.dt:
+            dropped = int(self.accumulator // self.dt)
+            self.dropped_steps += dropped
+            self.accumulator -= dropped * self.dt
+
+        self.alpha = self.accumulator / self.dt
+
+        return self.steps_taken
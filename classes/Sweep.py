@@ -0,0 +1,141 @@
+import itertools
+import random
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from functools import partial
+from typing import Iterable, List, Optional, Sequence, Tuple
+import pymunk
+from .Gains import Gains
+from .Simulation import Simulation, Snapshot, Trajectory
+
+
+@dataclass
+class JointMetrics:
+    overshoot: float
+    settling_time: float
+    steady_state_error: float
+    peak_force: float
+
+
+@dataclass
+class TrialResult:
+    gains: Gains
+    arm: JointMetrics
+    wrist: JointMetrics
+
+
+def grid(base: Gains = None, **values: Sequence[float]) -> List[Gains]:
+    """Returns every combination of the given gain values.
+
+    Keyword arguments:
+    base -- gains used for every field that is not swept
+    values -- field name of Gains mapped to the values to try, e.g. arm_kp=[1, 2]
+    """
+    base = base if base is not None else Gains()
+    names = list(values.keys())
+
+    return [replace(base, **dict(zip(names, combination)))
+            for combination in itertools.product(*values.values())]
+
+
+def random_sample(count: int, base: Gains = None, seed: Optional[int] = None, **ranges: Tuple[float, float]) -> List[Gains]:
+    """Returns gains drawn uniformly from the given ranges.
+
+    Keyword arguments:
+    count -- number of gain sets to draw
+    base -- gains used for every field that is not swept
+    seed -- seed for the random generator, for reproducible samples
+    ranges -- field name of Gains mapped to a (low, high) range
+    """
+    base = base if base is not None else Gains()
+    rng = random.Random(seed)
+
+    return [replace(base, **{name: rng.uniform(low, high) for name, (low, high) in ranges.items()})
+            for _ in range(count)]
+
+
+def joint_metrics(time: List[float], angle: List[float], target: List[float], force: List[float], tolerance: float) -> JointMetrics:
+    goal = target[-1]
+    direction = 1 if goal >= angle[0] else -1
+
+    overshoot = max(0, max(direction * (value - goal) for value in angle))
+
+    settling_time = 0
+    for t, value in zip(time, angle):
+        if abs(value - goal) > tolerance:
+            settling_time = t
+    if abs(angle[-1] - goal) > tolerance:
+        settling_time = float("inf")
+
+    tail = max(1, len(angle) // 10)
+    steady_state_error = sum(
+        abs(value - goal) for value in angle[-tail:]) / tail
+
+    peak_force = max(abs(value) for value in force)
+
+    return JointMetrics(overshoot, settling_time, steady_state_error, peak_force)
+
+
+def run_trial(gains: Gains, endpoint: Tuple[float, float] = (120, 100), duration: float = 5, dt: float = 1 / 60, tolerance: float = 0.02) -> TrialResult:
+    simulation = Simulation(gains=gains)
+    simulation.robot.move_endpoint(pymunk.Vec2d(*endpoint))
+    trajectory = simulation.run(duration, dt)
+
+    return TrialResult(
+        gains,
+        joint_metrics(trajectory.time, trajectory.arm_angle,
+                      trajectory.arm_target, trajectory.arm_force, tolerance),
+        joint_metrics(trajectory.time, trajectory.wrist_angle,
+                      trajectory.wrist_target, trajectory.wrist_force, tolerance)
+    )
+
+
+def sweep(gains: Iterable[Gains], processes: Optional[int] = None, chunksize: int = 1, **trial_options) -> List[TrialResult]:
+    """Runs every gain set as an isolated headless simulation.
+
+    Trials are spread across a process pool and returned in input order.
+
+    Keyword arguments:
+    gains -- gain sets to simulate, e.g. from grid() or random_sample()
+    processes -- worker count, defaults to the number of CPUs
+    chunksize -- trials handed to a worker at a time
+    trial_options -- forwarded to run_trial (endpoint, duration, dt, tolerance)
+    """
+    with ProcessPoolExecutor(processes) as executor:
+        return list(executor.map(partial(run_trial, **trial_options), gains, chunksize=chunksize))
+
+
+def best(results: Iterable[TrialResult], key: str = "settling_time", joint: str = "arm") -> TrialResult:
+    return min(results, key=lambda result: getattr(getattr(result, joint), key))
+
+
+_worker_simulation: Optional[Simulation] = None
+
+
+def _create_worker_simulation(simulation_options: dict):
+    global _worker_simulation
+    _worker_simulation = Simulation(**simulation_options)
+
+
+def _run_rollout(snapshot: Snapshot, endpoint: Optional[Tuple[float, float]], duration: float, dt: float) -> Trajectory:
+    _worker_simulation.restore(snapshot)
+    if endpoint is not None:
+        _worker_simulation.robot.move_endpoint(pymunk.Vec2d(*endpoint))
+
+    return _worker_simulation.run(duration, dt)
+
+
+def rollouts(snapshot: Snapshot, endpoints: Iterable[Optional[Tuple[float, float]]], duration: float = 2, dt: float = 1 / 60, processes: Optional[int] = None, **simulation_options) -> List[Trajectory]:
+    """Branches one rollout per endpoint from a shared snapshot.
+
+    Every worker builds its Simulation once and restores the snapshot
+    before each rollout, so no trial pays for setup or settling.
+
+    Keyword arguments:
+    snapshot -- state to start every rollout from, see Simulation.snapshot()
+    endpoints -- target for each rollout, None keeps the snapshot's target
+    processes -- worker count, defaults to the number of CPUs
+    simulation_options -- forwarded to Simulation, must match the scene the snapshot came from
+    """
+    with ProcessPoolExecutor(processes, initializer=_create_worker_simulation, initargs=(simulation_options,)) as executor:
+        return list(executor.map(partial(_run_rollout, snapshot, duration=duration, dt=dt), endpoints))
@@ -0,0 +1,203 @@
+import asyncio
+import collections
+import socket
+import struct
+import threading
+from typing import Dict, Iterator, Optional, Set
+
+MAGIC = b"KRIOSTLM"
+VERSION = 1
+
+# Stream layout:
+#   MAGIC | u32 version | u32 field count | u32 field name length | comma separated field names
+#   then fixed size frames, u32 sequence | f64 time | f32 for every other field
+HEADER = struct.Struct("<III")
+FIELDS = ("arm_angle", "wrist_angle", "arm_target", "wrist_target",
+          "arm_setpoint_velocity", "arm_force", "wrist_force")
+FRAME = struct.Struct("<Id" + "f" * len(FIELDS))
+
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+DISCONNECT = "disconnect"
+
+
+class Subscriber:
+    """One connected client, frames wait in its own bounded queue until the socket accepts them."""
+
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int, policy: str) -> None:
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.policy = policy
+        self.dropped = 0
+        self.closed = False
+        self.task: Optional[asyncio.Task] = None
+
+    def offer(self, frame: bytes):
+        if self.queue.full():
+            if self.policy == DISCONNECT:
+                self.close()
+                self.task.cancel()
+                return
+            self.dropped += 1
+            if self.policy == DROP_NEWEST:
+                return
+            self.queue.get_nowait()
+
+        self.queue.put_nowait(frame)
+
+    async def send(self):
+        while not self.closed:
+            frame = await self.queue.get()
+            self.writer.write(frame)
+            await self.writer.drain()
+
+    def close(self):
+        self.closed = True
+        self.writer.close()
+
+
+class TelemetryServer:
+    """Streams telemetry frames over TCP from a background thread.
+
+    publish() never blocks, frames go into a bounded queue that drops the
+    oldest frame when the network thread falls behind. Each subscriber has
+    its own queue, so a slow client only loses its own frames.
+
+    Keyword arguments:
+    host, port -- address to listen on, port 0 picks a free port
+    queue_size -- frames buffered between the simulation and the network thread
+    client_queue_size -- frames buffered for each subscriber
+    policy -- what to do when a subscriber's queue is full: "drop_oldest", "drop_newest" or "disconnect"
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, queue_size: int = 256, client_queue_size: int = 64, policy: str = DROP_OLDEST) -> None:
+        if policy not in (DROP_OLDEST, DROP_NEWEST, DISCONNECT):
+            raise ValueError(f"Unknown drop policy {policy}")
+
+        self.host = host
+        self.port = port
+        self.client_queue_size = client_queue_size
+        self.policy = policy
+
+        self.pending: collections.deque = collections.deque(maxlen=queue_size)
+        self.subscribers: Set[Subscriber] = set()
+        self.published = 0
+
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+        self.thread: Optional[threading.Thread] = None
+        self.__scheduled = False
+        self.__ready = threading.Event()
+
+    @property
+    def header(self) -> bytes:
+        names = ",".join(FIELDS).encode()
+        return MAGIC + HEADER.pack(VERSION, len(FIELDS), len(names)) + names
+
+    def start(self):
+        self.thread = threading.Thread(
+            target=self.__run, name="telemetry", daemon=True)
+        self.thread.start()
+        self.__ready.wait()
+
+    def stop(self):
+        if self.loop is None:
+            return
+
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop = None
+
+    def publish(self, time: float, *values: float):
+        """Queues one frame with a value for every field in FIELDS."""
+        if self.loop is None:
+            return
+
+        self.pending.append(FRAME.pack(
+            self.published & 0xFFFFFFFF, time, *values))
+        self.published += 1
+
+        # One wake-up covers every frame queued before the network thread gets to it
+        if not self.__scheduled:
+            self.__scheduled = True
+            self.loop.call_soon_threadsafe(self.__dispatch)
+
+    def __run(self):
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(
+            self.__connected, self.host, self.port))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.__ready.set()
+
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.__shutdown())
+            self.loop.close()
+
+    async def __shutdown(self):
+        self.server.close()
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def __dispatch(self):
+        self.__scheduled = False
+        while self.pending:
+            frame = self.pending.popleft()
+            for subscriber in list(self.subscribers):
+                subscriber.offer(frame)
+
+    async def __connected(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        writer.get_extra_info("socket").setsockopt(
+            socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        writer.write(self.header)
+
+        subscriber = Subscriber(writer, self.client_queue_size, self.policy)
+        subscriber.task = asyncio.current_task()
+        self.subscribers.add(subscriber)
+        try:
+            await subscriber.send()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            subscriber.close()
+
+
+class SimulationTelemetry:
+    """Publishes the robot of a Simulation after every step."""
+
+    def __init__(self, simulation, server: TelemetryServer) -> None:
+        self.simulation = simulation
+        self.server = server
+
+    def record(self):
+        robot = self.simulation.robot
+        self.server.publish(self.simulation.time, robot.arm_body.body.angle, robot.wrist_body.body.angle,
+                            robot.arm_target_angle, robot.wrist_target_angle, robot.setpoint_velocity,
+                            robot.arm_output, robot.wrist_output)
+
+
+def iter_frames(host: str = "127.0.0.1", port: int = 0) -> Iterator[Dict[str, float]]:
+    """Connects to a TelemetryServer and yields every frame as a dict."""
+    with socket.create_connection((host, port)) as connection:
+        stream = connection.makefile("rb")
+        if stream.read(len(MAGIC)) != MAGIC:
+            raise ValueError("Not a telemetry stream")
+
+        version, count, size = HEADER.unpack(stream.read(HEADER.size))
+        if version != VERSION:
+            raise ValueError(f"Unsupported telemetry version {version}")
+        names = stream.read(size).decode().split(",")
+        frame = struct.Struct("<Id" + "f" * count)
+
+        while True:
+            data = stream.read(frame.size)
+            if len(data) < frame.size:
+                return
+
+            sequence, time, *values = frame.unpack(data)
+            yield {"sequence": sequence, "time": time, **dict(zip(names, values))}
@@ -1,12 +1,38 @@
+from abc import ABC, abstractmethod
 from datetime import datetime
 
 
+class Clock(ABC):
+    @abstractmethod
+    def now(self) -> float:
+        pass
+
+
+class WallClock(Clock):
+    def now(self) -> float:
+        return datetime.now().timestamp()
+
+
+class SimulatedClock(Clock):
+    """Clock that only moves when the simulation advances it."""
+
+    def __init__(self, start: float = 0.0) -> None:
+        self.time = start
+
+    def now(self) -> float:
+        return self.time
+
+    def advance(self, delta_time: float):
+        self.time += delta_time
+
+
 class Timer:
-    def __init__(self) -> None:
+    def __init__(self, clock: Clock = None) -> None:
+        self.clock = clock if clock is not None else WallClock()
         self.start_time = None
 
     def start(self):
-        self.start_time = datetime.now()
+        self.start_time = self.clock.now()
 
     def get_delta_sec(self):
-        return (datetime.now().timestamp() - self.start_time.timestamp())
+        return self.clock.now() - self.start_time
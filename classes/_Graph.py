@@ -1,12 +1,196 @@
 import arcade
-from typing import List, Dict
+import numpy as np
+from collections import deque
+from arcade.gl import BufferDescription
+from typing import Dict
+
+VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+uniform vec2 origin;
+uniform vec2 scale;
+uniform float minimum;
+uniform int first;
+
+in float in_value;
+
+void main() {
+    float x = origin.x + float(gl_VertexID - first) * scale.x;
+    float y = origin.y + (in_value - minimum) * scale.y;
+    gl_Position = proj.matrix * vec4(x, y, 0.0, 1.0);
+}
+"""
+
+# Decimated plots draw a (x, value) pair for the low and the high of every pixel column
+COLUMNS_VERTEX_SHADER = """
+#version 330
+
+uniform Projection {
+    uniform mat4 matrix;
+} proj;
+
+uniform vec2 origin;
+uniform vec2 scale;
+uniform float minimum;
+
+in vec2 in_vert;
+
+void main() {
+    float x = origin.x + in_vert.x;
+    float y = origin.y + (in_vert.y - minimum) * scale.y;
+    gl_Position = proj.matrix * vec4(x, y, 0.0, 1.0);
+}
+"""
+
+FRAGMENT_SHADER = """
+#version 330
+
+uniform vec4 color;
+out vec4 f_color;
+
+void main() {
+    f_color = color;
+}
+"""
 
 
 class Parameter:
-    def __init__(self, label: str, color: arcade.Color) -> None:
-        self.data: List[float] = []
+    def __init__(self, label: str, color: arcade.Color, capacity: int) -> None:
         self.label = label
         self.color = color
+        self.capacity = capacity
+
+        # Every sample is stored twice, so the newest `capacity` samples are
+        # always one contiguous slice that can be drawn as a single strip
+        self.buffer = np.zeros(capacity * 2, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.written = 0
+        self.uploaded = 0
+        self.tracked = 0
+
+        # Monotonic (index, value) queues, the fronts are the min and max of the window
+        self.minima = deque()
+        self.maxima = deque()
+
+        self.vbo = None
+        self.geometry = None
+        self.columns = None
+        self.columns_vbo = None
+        self.columns_geometry = None
+
+    @property
+    def first(self) -> int:
+        return self.head + self.capacity - self.count
+
+    @property
+    def data(self) -> np.ndarray:
+        return self.buffer[self.first:self.head + self.capacity]
+
+    def append(self, value: float):
+        self.buffer[self.head] = value
+        self.buffer[self.head + self.capacity] = value
+        self.head = (self.head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.written += 1
+
+    def track(self):
+        """Feeds the samples appended since the last call into the min/max queues."""
+        pending = min(self.written - self.tracked, self.count)
+        self.tracked = self.written
+        minima = self.minima
+        maxima = self.maxima
+        for index, value in zip(range(self.written - pending, self.written), self.data[self.count - pending:].tolist()):
+            while minima and minima[-1][1] >= value:
+                minima.pop()
+            minima.append((index, value))
+            while maxima and maxima[-1][1] <= value:
+                maxima.pop()
+            maxima.append((index, value))
+
+        expired = self.written - self.count
+        while minima and minima[0][0] < expired:
+            minima.popleft()
+        while maxima and maxima[0][0] < expired:
+            maxima.popleft()
+
+    @property
+    def minimum(self) -> float:
+        return self.minima[0][1]
+
+    @property
+    def maximum(self) -> float:
+        return self.maxima[0][1]
+
+    def resize(self, capacity: int):
+        data = self.data[-capacity:].copy()
+
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity * 2, dtype=np.float32)
+        self.head = 0
+        self.count = 0
+        self.minima.clear()
+        self.maxima.clear()
+        for value in data:
+            self.append(value)
+        self.tracked = self.written - self.count
+
+        self.vbo = None
+        self.geometry = None
+        self.columns = None
+        self.columns_vbo = None
+        self.columns_geometry = None
+
+    def upload(self, ctx: arcade.ArcadeContext):
+        if self.vbo is None:
+            self.vbo = ctx.buffer(data=self.buffer)
+            self.geometry = ctx.geometry(
+                [BufferDescription(self.vbo, "1f", ["in_value"])], mode=ctx.LINE_STRIP)
+            self.uploaded = self.written
+            return
+
+        pending = min(self.written - self.uploaded, self.capacity)
+        self.uploaded = self.written
+        if pending == 0:
+            return
+
+        # Only the slots written since the last upload (and their mirror) change
+        start = (self.head - pending) % self.capacity
+        stop = start + pending
+        for begin, end in ((start, stop),
+                           (start + self.capacity, min(stop, self.capacity) + self.capacity),
+                           (0, stop - self.capacity)):
+            if end > begin:
+                self.vbo.write(self.buffer[begin:end], offset=begin * 4)
+
+    def upload_columns(self, ctx: arcade.ArcadeContext, width: float) -> int:
+        """Uploads the low and high of every pixel column of the plot.
+
+        Returns the number of vertices to draw.
+        """
+        if self.columns is None or self.columns[0] != width:
+            pixels = np.floor(np.arange(self.capacity) * (width / self.capacity))
+            starts = np.flatnonzero(np.diff(pixels)) + 1
+            starts = np.concatenate([[0], starts])
+            vertices = np.zeros((len(starts) * 2, 2), dtype=np.float32)
+            vertices[0::2, 0] = vertices[1::2, 0] = pixels[starts]
+            self.columns = (width, starts, vertices)
+            self.columns_vbo = ctx.buffer(reserve=vertices.nbytes)
+            self.columns_geometry = ctx.geometry(
+                [BufferDescription(self.columns_vbo, "2f", ["in_vert"])], mode=ctx.LINE_STRIP)
+
+        _, starts, vertices = self.columns
+        starts = starts[:np.searchsorted(starts, self.count)]
+        data = self.data
+        vertices[0:len(starts) * 2:2, 1] = np.minimum.reduceat(data, starts)
+        vertices[1:len(starts) * 2:2, 1] = np.maximum.reduceat(data, starts)
+        self.columns_vbo.write(vertices[:len(starts) * 2])
+
+        return len(starts) * 2
 
 
 class Graph:
@@ -21,8 +205,16 @@ class Graph:
         self.duration = 8
         self.FPS = 60
         self.auto_zoom = True
+        # Draw only the low and high of each pixel column once there are more samples than pixels
+        self.decimate = False
 
         self.parameters: Dict[str, Parameter] = {}
+        self.program = None
+        self.columns_program = None
+
+    @property
+    def capacity(self) -> int:
+        return int(self.FPS * self.duration)
 
     def set_min(self, min: float):
         self.auto_zoom = False
@@ -34,25 +226,32 @@ class Graph:
 
     def set_duration(self, duration: int):
         self.duration = duration
+        for parameter in self.parameters.values():
+            parameter.resize(self.capacity)
 
     def add_parameter(self, parameter: str, color: arcade.Color):
-        self.parameters[parameter] = Parameter(parameter, color)
+        self.parameters[parameter] = Parameter(
+            parameter, color, self.capacity)
 
     def append_data(self, parameter: str, data: float):
-        self.parameters[parameter].data.append(data)
-        if self.auto_zoom:
-            if data > self.max:
-                self.max = data
-            elif data < self.min:
-                self.min = data
+        self.parameters[parameter].append(data)
 
-        if len(self.parameters[parameter].data) > self.FPS * self.duration:
-            self.parameters[parameter].data.pop(0)
+    def update_bounds(self):
+        # Follow only what is on screen, so a spike stops squashing the plot once it scrolls out
+        parameters = [parameter for parameter in self.parameters.values()
+                      if parameter.count]
+        for parameter in parameters:
+            parameter.track()
+        if parameters:
+            self.min = min(parameter.minimum for parameter in parameters)
+            self.max = max(parameter.maximum for parameter in parameters)
 
     def update(self):
         pass
 
     def draw(self):
+        if self.auto_zoom:
+            self.update_bounds()
 
         # Background
         arcade.draw_rectangle_filled(
@@ -74,14 +273,44 @@ class Graph:
             self.center_x + 20, self.center_y + 10, self.width - offset, self.height - 40, arcade.color.GOLD, 1)
 
         # Graph data
-        spacing_x = (self.width - offset) / (self.FPS * self.duration)
+        ctx = arcade.get_window().ctx
+        if self.program is None:
+            self.program = ctx.program(
+                vertex_shader=VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
 
         delta = self.max - self.min
+        origin = ((self.center_x + 20) - ((self.width - offset) / 2),
+                  self.center_y + 10 - (self.height - 40) / 2)
+        scale = ((self.width - offset) / self.capacity,
+                 (self.height - 40) / delta if delta != 0 else 0)
+        self.program["origin"] = origin
+        self.program["scale"] = scale
+        self.program["minimum"] = self.min
+
+        decimate = self.decimate and self.capacity > self.width - offset
+        if decimate:
+            if self.columns_program is None:
+                self.columns_program = ctx.program(
+                    vertex_shader=COLUMNS_VERTEX_SHADER, fragment_shader=FRAGMENT_SHADER)
+            self.columns_program["origin"] = origin
+            self.columns_program["scale"] = scale
+            self.columns_program["minimum"] = self.min
+
         for parameter in self.parameters.values():
-            point_list = []
-            for index, value in enumerate(parameter.data):
-                y = ((value - self.min) / delta)
-                y = (self.height - 40) * y
-                point_list.append(
-                    [index * spacing_x + ((self.center_x + 20) - ((self.width - offset) / 2)), y + self.center_y + 10 - (self.height - 40) / 2])
-            arcade.draw_line_strip(point_list, parameter.color, 1)
+            if decimate:
+                if parameter.count < 2:
+                    continue
+                vertices = parameter.upload_columns(ctx, self.width - offset)
+                self.columns_program["color"] = arcade.get_four_float_color(parameter.color)
+                parameter.columns_geometry.render(
+                    self.columns_program, vertices=vertices)
+                continue
+
+            parameter.upload(ctx)
+            if parameter.count < 2:
+                continue
+
+            self.program["first"] = parameter.first
+            self.program["color"] = arcade.get_four_float_color(parameter.color)
+            parameter.geometry.render(
+                self.program, first=parameter.first, vertices=parameter.count)
@@ -1,2 +1,40 @@
-from .Robot import Robot
-from .kinematics.DoubleJointed import DoubleJointed
+import importlib
+import sys
+import types
+
+# Robot and Simulation pull in arcade and pymunk, so they are only imported
+# when first used. Importing classes.controls or classes.kinematics stays light.
+__all__ = ["Robot", "DoubleJointed", "Simulation", "Trajectory", "Gains"]
+
+_modules = {
+    "Robot": ".Robot",
+    "DoubleJointed": ".kinematics.DoubleJointed",
+    "Simulation": ".Simulation",
+    "Trajectory": ".Simulation",
+    "Gains": ".Gains",
+}
+
+
+def __getattr__(name: str):
+    if name not in _modules:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(importlib.import_module(_modules[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
+
+
+class _Package(types.ModuleType):
+    def __setattr__(self, name, value):
+        # Importing a submodule binds it on the package, for Robot, Simulation
+        # and Gains that would hide the class of the same name
+        if name in _modules and isinstance(value, types.ModuleType) and hasattr(value, name):
+            value = getattr(value, name)
+        super().__setattr__(name, value)
+
+
+sys.modules[__name__].__class__ = _Package
@@ -1,4 +1,27 @@
 import math
+import numpy as np
+from dataclasses import dataclass
+from typing import Tuple
+
+
+@dataclass
+class Envelope:
+    """Achievable velocity and acceleration over a range of joint angles.
+
+    Velocity limits are for zero acceleration, acceleration limits for zero
+    velocity. Angles between samples are interpolated linearly.
+    """
+    angles: np.ndarray
+    max_velocity: np.ndarray
+    min_velocity: np.ndarray
+    max_acceleration: np.ndarray
+    min_acceleration: np.ndarray
+
+    def velocity_limits(self, angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return np.interp(angles, self.angles, self.min_velocity), np.interp(angles, self.angles, self.max_velocity)
+
+    def acceleration_limits(self, angles: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        return np.interp(angles, self.angles, self.min_acceleration), np.interp(angles, self.angles, self.max_acceleration)
 
 
 class ArmFeedforward:
@@ -15,6 +38,7 @@ class ArmFeedforward:
         self.max_output = max
         self.min_output = min
 
+    @staticmethod
     def signum(number: float):
         if number == 0:
             return 0
@@ -24,19 +48,42 @@ class ArmFeedforward:
             return -1
 
     def calculate(self, position_radians: float, velocity_rad_per_sec: float, acceleration_rad_per_sec: float = None):
-        if acceleration_rad_per_sec == None:
-            return self.calculate(position_radians, velocity_rad_per_sec, 0)
+        if acceleration_rad_per_sec is None:
+            acceleration_rad_per_sec = 0
 
         output = self.s * ArmFeedforward.signum(velocity_rad_per_sec) + self.g * math.cos(
             position_radians) + self.v * velocity_rad_per_sec + self.a * acceleration_rad_per_sec
+        if self.max_output is not None and output > self.max_output:
+            return self.max_output
+        elif self.min_output is not None and output < self.min_output:
+            return self.min_output
+
+        return output
+
+    def calculate_many(self, positions_radians: np.ndarray, velocities_rad_per_sec: np.ndarray, accelerations_rad_per_sec: np.ndarray = None) -> np.ndarray:
+        """Same as calculate() for arrays of setpoints."""
+        output = self.__unclamped_many(
+            positions_radians, velocities_rad_per_sec, accelerations_rad_per_sec)
         if self.max_output is not None or self.min_output is not None:
-            if output > self.max_output:
-                return self.max_output
-            elif output < self.min_output:
-                return self.min_output
+            output = np.clip(output, self.min_output, self.max_output)
 
         return output
 
+    def feasible_many(self, max_voltage: float, positions_radians: np.ndarray, velocities_rad_per_sec: np.ndarray, accelerations_rad_per_sec: np.ndarray) -> np.ndarray:
+        """Returns a mask of which setpoints need no more than max_voltage.
+
+        The output range is ignored, a clamped output would always look feasible.
+        """
+        return np.abs(self.__unclamped_many(positions_radians, velocities_rad_per_sec, accelerations_rad_per_sec)) <= max_voltage
+
+    def __unclamped_many(self, positions_radians: np.ndarray, velocities_rad_per_sec: np.ndarray, accelerations_rad_per_sec: np.ndarray = None) -> np.ndarray:
+        if accelerations_rad_per_sec is None:
+            accelerations_rad_per_sec = 0
+
+        velocities_rad_per_sec = np.asarray(velocities_rad_per_sec, dtype=float)
+        return self.s * np.sign(velocities_rad_per_sec) + self.g * np.cos(
+            positions_radians) + self.v * velocities_rad_per_sec + self.a * np.asarray(accelerations_rad_per_sec, dtype=float)
+
     def max_achievable_velocity(self, max_voltage: float, angle: float, acceleration: float):
         return (max_voltage - self.s - math.cos(angle) * self.g - acceleration * self.a) / self.v
 
@@ -47,7 +94,45 @@ class ArmFeedforward:
         return (max_voltage - self.s * ArmFeedforward.signum(velocity) - math.cos(angle) * self.g - velocity * self.v) / self.a
 
     def min_achievable_acceleration(self, max_voltage: float, angle: float, velocity: float):
-        return self.max_achievable_velocity(-max_voltage, angle, velocity)
+        return self.max_achievable_acceleration(-max_voltage, angle, velocity)
+
+    # Batch versions of the helpers above. With a zero v or a gain that term
+    # cannot change the output: the limit is +/- inf when the voltage left
+    # over allows it (unlimited) and the opposite inf when it does not
+    # (infeasible at any velocity or acceleration). Exactly no voltage left
+    # over would be 0 / 0, which counts as unlimited.
+
+    @staticmethod
+    def __limit(numerator: np.ndarray, gain: float, unlimited: float) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            limit = numerator / gain
+
+        return np.where(np.isnan(limit), unlimited, limit)
+
+    def max_achievable_velocity_many(self, max_voltage: float, angles: np.ndarray, accelerations: np.ndarray) -> np.ndarray:
+        return self.__limit(max_voltage - self.s - np.cos(angles) * self.g - np.asarray(accelerations) * self.a, self.v, math.inf)
+
+    def min_achievable_velocity_many(self, max_voltage: float, angles: np.ndarray, accelerations: np.ndarray) -> np.ndarray:
+        return self.__limit(-max_voltage + self.s - np.cos(angles) * self.g - np.asarray(accelerations) * self.a, self.v, -math.inf)
+
+    def max_achievable_acceleration_many(self, max_voltage: float, angles: np.ndarray, velocities: np.ndarray) -> np.ndarray:
+        velocities = np.asarray(velocities, dtype=float)
+        return self.__limit(max_voltage - self.s * np.sign(velocities) - np.cos(angles) * self.g - velocities * self.v, self.a, math.inf)
+
+    def min_achievable_acceleration_many(self, max_voltage: float, angles: np.ndarray, velocities: np.ndarray) -> np.ndarray:
+        velocities = np.asarray(velocities, dtype=float)
+        return self.__limit(-max_voltage - self.s * np.sign(velocities) - np.cos(angles) * self.g - velocities * self.v, self.a, -math.inf)
+
+    def envelope(self, max_voltage: float, angle_range: Tuple[float, float] = (-math.pi, math.pi), samples: int = 361) -> Envelope:
+        """Precomputes the achievable velocity and acceleration over angle_range."""
+        angles = np.linspace(angle_range[0], angle_range[1], samples)
+        zeros = np.zeros(samples)
+
+        return Envelope(angles,
+                        self.max_achievable_velocity_many(max_voltage, angles, zeros),
+                        self.min_achievable_velocity_many(max_voltage, angles, zeros),
+                        self.max_achievable_acceleration_many(max_voltage, angles, zeros),
+                        self.min_achievable_acceleration_many(max_voltage, angles, zeros))
 
     def auto_tune_g(self, current_position: float):
         if self.previous_position != None:
@@ -0,0 +1,172 @@
+import math
+import numpy as np
+from typing import Dict, Optional, Tuple
+
+
+class PID:
+    """PID controller with a trapezoidal integral.
+
+    Like PID_Py, the first compute() only records the time and returns 0.
+
+    Keyword arguments:
+    integral_limit -- clamps the integral term to +/- this value
+    output_limits -- (min, max) clamp of the output, either may be None
+    derivative_on_measurement -- differentiate the measurement instead of the error, so setpoint steps do not kick
+    """
+
+    def __init__(self, kp: float, ki: float, kd: float, integral_limit: Optional[float] = None, output_limits: Tuple[Optional[float], Optional[float]] = (None, None), derivative_on_measurement: bool = False) -> None:
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.integral_limit = integral_limit
+        self.output_limits = output_limits
+        self.derivative_on_measurement = derivative_on_measurement
+        self.reset()
+
+    def reset(self):
+        self.integral = 0.0
+        self.previous_error = 0.0
+        self.previous_measurement = 0.0
+        self.previous_time = None
+        self.output = 0.0
+
+    def compute(self, setpoint: float, measurement: float, now: float) -> float:
+        error = setpoint - measurement
+        if self.previous_time is None:
+            self.previous_time = now
+            self.previous_measurement = measurement
+            self.output = 0.0
+            return 0.0
+
+        dt = now - self.previous_time
+        if dt <= 0:
+            return self.output
+
+        self.integral += (error + self.previous_error) / 2 * dt * self.ki
+        if self.integral_limit is not None:
+            self.integral = min(max(self.integral, -self.integral_limit), self.integral_limit)
+
+        if self.derivative_on_measurement:
+            derivative = (self.previous_measurement - measurement) / dt * self.kd
+        else:
+            derivative = (error - self.previous_error) / dt * self.kd
+
+        output = self.kp * error + self.integral + derivative
+        low, high = self.output_limits
+        if low is not None and output < low:
+            output = low
+        elif high is not None and output > high:
+            output = high
+
+        self.previous_error = error
+        self.previous_measurement = measurement
+        self.previous_time = now
+        self.output = output
+
+        return output
+
+
+class PIDBatch:
+    """Many PID controllers updated together, each term is an array of the same shape.
+
+    compute() works in place on preallocated arrays, so a step allocates
+    nothing. The returned array is reused by the next call.
+
+    Keyword arguments:
+    kp, ki, kd -- gains, broadcast to shape
+    integral_limit -- clamps the integral terms to +/- this value, None for no clamp
+    output_min, output_max -- output clamps, None for no clamp
+    derivative_on_measurement -- differentiate the measurements instead of the errors
+    """
+
+    def __init__(self, kp, ki, kd, shape: Optional[Tuple[int, ...]] = None, integral_limit=None, output_min=None, output_max=None, derivative_on_measurement: bool = False) -> None:
+        if shape is None:
+            shape = np.broadcast(np.asarray(kp), np.asarray(ki), np.asarray(kd)).shape
+
+        self.kp = self.__array(kp, shape)
+        self.ki = self.__array(ki, shape)
+        self.kd = self.__array(kd, shape)
+        self.integral_limit = self.__array(
+            math.inf if integral_limit is None else integral_limit, shape)
+        self.output_min = self.__array(
+            -math.inf if output_min is None else output_min, shape)
+        self.output_max = self.__array(
+            math.inf if output_max is None else output_max, shape)
+        self.derivative_on_measurement = derivative_on_measurement
+
+        self.integral = np.zeros(shape)
+        self.previous_error = np.zeros(shape)
+        self.previous_measurement = np.zeros(shape)
+        self.output = np.zeros(shape)
+        self.previous_time = None
+
+        # Scratch space for compute()
+        self.error = np.zeros(shape)
+        self.term = np.zeros(shape)
+
+    @staticmethod
+    def __array(value, shape: Tuple[int, ...]) -> np.ndarray:
+        return np.array(np.broadcast_to(np.asarray(value, dtype=float), shape))
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.output.shape
+
+    def reset(self):
+        self.integral[...] = 0
+        self.previous_error[...] = 0
+        self.previous_measurement[...] = 0
+        self.output[...] = 0
+        self.previous_time = None
+
+    def compute(self, setpoints: np.ndarray, measurements: np.ndarray, now: float) -> np.ndarray:
+        error = np.subtract(setpoints, measurements, out=self.error)
+        if self.previous_time is None:
+            self.previous_time = now
+            self.previous_measurement[...] = measurements
+            self.output[...] = 0
+            return self.output
+
+        dt = now - self.previous_time
+        if dt <= 0:
+            return self.output
+
+        term = self.term
+
+        np.add(error, self.previous_error, out=term)
+        term *= dt / 2
+        term *= self.ki
+        self.integral += term
+        np.negative(self.integral_limit, out=term)
+        np.maximum(self.integral, term, out=self.integral)
+        np.minimum(self.integral, self.integral_limit, out=self.integral)
+
+        if self.derivative_on_measurement:
+            np.subtract(self.previous_measurement, measurements, out=term)
+        else:
+            np.subtract(error, self.previous_error, out=term)
+        term /= dt
+        term *= self.kd
+
+        np.multiply(self.kp, error, out=self.output)
+        self.output += self.integral
+        self.output += term
+        np.clip(self.output, self.output_min, self.output_max, out=self.output)
+
+        self.previous_error[...] = error
+        self.previous_measurement[...] = measurements
+        self.previous_time = now
+
+        return self.output
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {"integral": self.integral.copy(), "previous_error": self.previous_error.copy(),
+                "previous_measurement": self.previous_measurement.copy(), "output": self.output.copy(),
+                "previous_time": self.previous_time}
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.integral[...] = state["integral"]
+        self.previous_error[...] = state["previous_error"]
+        self.previous_measurement[...] = state["previous_measurement"]
+        self.output[...] = state["output"]
+        self.previous_time = state["previous_time"]
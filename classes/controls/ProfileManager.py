@@ -0,0 +1,145 @@
+import math
+from collections import OrderedDict
+import numpy as np
+from typing import Optional, Tuple, Union
+from .Trapezoidal import Constraints, State, TrapezoidProfile
+
+Key = Tuple[float, float, float, float, float, float]
+
+
+class BrakingProfile:
+    """Brakes to rest at max acceleration, then follows a TrapezoidProfile from where it stopped.
+
+    TrapezoidProfile cannot overshoot, so a goal inside the stopping
+    distance is reached by stopping first and coming back.
+    """
+
+    def __init__(self, constraints: Constraints, goal: State, initial: State) -> None:
+        self.constraints = constraints
+        self.initial = State(initial.position, initial.velocity)
+        self.deceleration = -math.copysign(
+            constraints.max_acceleration, initial.velocity)
+        self.brake_time = abs(initial.velocity) / constraints.max_acceleration
+        stop = initial.position + initial.velocity * self.brake_time / 2
+        self.profile = TrapezoidProfile(constraints, goal, State(stop, 0))
+
+    @staticmethod
+    def needed(constraints: Constraints, goal: State, initial: State) -> bool:
+        """Whether initial moves towards goal too fast to stop there, or faster than the constraints allow."""
+        if abs(initial.velocity) > constraints.max_velocity:
+            return True
+
+        distance = goal.position - initial.position
+        if initial.velocity * distance <= 0:
+            return False
+
+        stopping = (initial.velocity ** 2 - goal.velocity ** 2) / \
+            (2 * constraints.max_acceleration)
+        return stopping > abs(distance)
+
+    @property
+    def total_time(self):
+        return self.brake_time + self.profile.total_time
+
+    def is_finished(self, t: float):
+        return t >= self.total_time
+
+    def calculate(self, t: float) -> State:
+        if t < self.brake_time:
+            return State(self.initial.position + (self.initial.velocity + self.deceleration * t / 2) * t,
+                         self.initial.velocity + self.deceleration * t)
+
+        return self.profile.calculate(t - self.brake_time)
+
+    def calculate_many(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        t = np.asarray(t, dtype=float)
+        braking = t < self.brake_time
+        position, velocity = self.profile.calculate_many(
+            np.maximum(t - self.brake_time, 0))
+        position = np.where(braking, self.initial.position + (
+            self.initial.velocity + self.deceleration * t / 2) * t, position)
+        velocity = np.where(
+            braking, self.initial.velocity + self.deceleration * t, velocity)
+
+        return position, velocity
+
+
+Profile = Union[TrapezoidProfile, BrakingProfile]
+
+
+class ProfileManager:
+    """Hands out TrapezoidProfiles, reusing the ones already solved for the same request.
+
+    Profiles are keyed on (constraints, initial, goal) and the least
+    recently used are dropped once more than capacity are kept. The initial
+    state comes from a live joint angle, so it is rounded to resolution
+    before keying and the profile starts from the rounded state; otherwise
+    no two requests would ever share a profile.
+
+    Keyword arguments:
+    resolution -- step the initial position and velocity are rounded to
+    """
+
+    def __init__(self, capacity: int = 128, resolution: float = 1e-3) -> None:
+        self.capacity = capacity
+        self.resolution = resolution
+        self.profiles: "OrderedDict[Key, TrapezoidProfile]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(constraints: Constraints, goal: State, initial: State) -> Key:
+        return (constraints.max_velocity, constraints.max_acceleration,
+                initial.position, initial.velocity, goal.position, goal.velocity)
+
+    def quantize(self, state: State) -> State:
+        return State(round(state.position / self.resolution) * self.resolution,
+                     round(state.velocity / self.resolution) * self.resolution)
+
+    def get(self, constraints: Constraints, goal: State, initial: State = None) -> TrapezoidProfile:
+        initial = self.quantize(initial if initial is not None else State(0, 0))
+
+        key = self.key(constraints, goal, initial)
+        profile = self.profiles.get(key)
+        if profile is not None:
+            self.hits += 1
+            self.profiles.move_to_end(key)
+            return profile
+
+        self.misses += 1
+        profile = self.profiles[key] = TrapezoidProfile(
+            constraints, goal, initial)
+        if len(self.profiles) > self.capacity:
+            self.profiles.popitem(last=False)
+
+        return profile
+
+    def replan(self, current: Optional[Profile], t: float, constraints: Constraints, goal: State, initial: State = None) -> Profile:
+        """Returns the profile to follow towards goal.
+
+        current is kept when it already heads for goal with the same
+        constraints. Otherwise the new profile starts exactly where current
+        is at time t, so a goal change mid-motion keeps position and velocity
+        continuous. A goal inside the stopping distance gets a BrakingProfile.
+        Such mid-motion profiles never repeat, so they are not cached. initial
+        is only used when there is no current profile.
+        """
+        if current is None:
+            return self.get(constraints, goal, initial)
+
+        if current.constraints == constraints and current.calculate(math.inf) == goal:
+            return current
+
+        state = current.calculate(t)
+        if BrakingProfile.needed(constraints, goal, state):
+            profile = BrakingProfile(constraints, goal, state)
+        else:
+            profile = TrapezoidProfile(constraints, goal, state)
+
+        start = profile.calculate(0)
+        if not (math.isclose(start.position, state.position, abs_tol=1e-9) and
+                math.isclose(start.velocity, state.velocity, abs_tol=1e-9)):
+            raise ValueError(
+                f"Replanned profile starts at {start} instead of {state}")
+
+        return profile
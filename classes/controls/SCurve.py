@@ -1,11 +1,148 @@
 from __future__ import annotations
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Tuple
 import math
+import numpy as np
+
+
+@dataclass
+class SCurveState:
+    position: float
+    velocity: float
+    acceleration: float
+
+
+class SCurveProfile:
+    def __init__(self, max_v: float, max_a: float, time_to_max_a: float, goal: float) -> None:
+        self.max_v = max_v
+        self.max_a = max_a
+        self.time_to_max_a = time_to_max_a
+        self.goal = goal
+
+        j = max_a / time_to_max_a
+
+        # Speeding up to v covers v * (ramp + v / a), the same again to stop
+        velocity, acceleration = self.__peak(max_v, max_a, j)
+        ramp = acceleration / j
+        short_profile = velocity * (ramp + velocity / acceleration) > goal
+        if short_profile:
+            velocity = max_a * (
+                math.sqrt(goal / max_a + 0.25 * time_to_max_a**2) -
+                0.5 * time_to_max_a
+            )
+            acceleration = max_a
+            if velocity < max_a * time_to_max_a:
+                # Too short to reach max_a: a pure jerk ramp, goal = 2 a^3 / j^2
+                acceleration = (goal * j * j / 2) ** (1 / 3)
+                velocity = acceleration * acceleration / j
+            ramp = acceleration / j
+
+        self.profile_max_v = velocity
+        self.profile_max_a = acceleration
+
+        # Find times at critical points
+        self.t1 = ramp
+        # max() keeps rounding from ending the constant acceleration phase before it starts
+        self.t2 = max(velocity / acceleration, ramp) if acceleration > 0 else 0.0
+        self.t3 = self.t2 + ramp
+        if short_profile:
+            self.t4 = self.t3
+        else:
+            self.t4 = goal / velocity
+        self.t5 = self.t4 + ramp
+        self.t6 = self.t4 + self.t2
+        self.t7 = self.t6 + ramp
+
+        # Each phase has a constant jerk, so the state at its start is enough
+        # to evaluate any point inside it in closed form
+        self.boundaries = [0.0, self.t1, self.t2,
+                           self.t3, self.t4, self.t5, self.t6, self.t7]
+        if any(end < start for start, end in zip(self.boundaries, self.boundaries[1:])):
+            raise ValueError(
+                f"S-curve phases overlap for max_v={max_v}, max_a={max_a}, time_to_max_a={time_to_max_a}, goal={goal}")
+        self.jerks = [j, 0.0, -j, 0.0, -j, 0.0, j, 0.0]
+
+        self.positions = [0.0]
+        self.velocities = [0.0]
+        self.accelerations = [0.0]
+        for phase in range(len(self.boundaries) - 1):
+            tau = self.boundaries[phase + 1] - self.boundaries[phase]
+            x, v, a = self.__integrate(phase, tau)
+            self.positions.append(x)
+            self.velocities.append(v)
+            self.accelerations.append(a)
+
+        if not math.isclose(self.positions[-1], goal, rel_tol=1e-9, abs_tol=1e-9):
+            raise ValueError(
+                f"S-curve ends at {self.positions[-1]} instead of {goal}")
+
+        # Stop exactly at the goal, at rest, once the profile is complete
+        self.positions[-1] = goal
+        self.velocities[-1] = 0.0
+        self.accelerations[-1] = 0.0
+
+    @staticmethod
+    def __peak(max_v: float, max_a: float, j: float) -> Tuple[float, float]:
+        """Returns the cruise velocity and peak acceleration of a profile long enough to reach max_v."""
+        if max_v < max_a * max_a / j:
+            # max_v is reached while acceleration is still ramping up
+            return max_v, math.sqrt(max_v * j)
+
+        return max_v, max_a
+
+    def __integrate(self, phase: int, tau):
+        x = self.positions[phase]
+        v = self.velocities[phase]
+        a = self.accelerations[phase]
+        j = self.jerks[phase]
+
+        return (x + v * tau + a * tau**2 / 2 + j * tau**3 / 6,
+                v + a * tau + j * tau**2 / 2,
+                a + j * tau)
+
+    @property
+    def total_time(self):
+        return self.t7
+
+    def is_finished(self, t: float):
+        return t >= self.total_time
+
+    def calculate(self, t: float) -> SCurveState:
+        t = max(t, 0.0)
+        phase = bisect_right(self.boundaries, t) - 1
+
+        return SCurveState(*self.__integrate(phase, t - self.boundaries[phase]))
+
+    def calculate_many(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Evaluates the profile at every timestamp in one vectorized pass.
+
+        Returns:
+        position -- array of positions, same shape as t
+        velocity -- array of velocities, same shape as t
+        acceleration -- array of accelerations, same shape as t
+        """
+        t = np.maximum(np.asarray(t, dtype=float), 0.0)
+        phase = np.searchsorted(self.boundaries, t, side="right") - 1
+        tau = t - np.asarray(self.boundaries)[phase]
+
+        x = np.asarray(self.positions)[phase]
+        v = np.asarray(self.velocities)[phase]
+        a = np.asarray(self.accelerations)[phase]
+        j = np.asarray(self.jerks)[phase]
+
+        return (x + v * tau + a * tau**2 / 2 + j * tau**3 / 6,
+                v + a * tau + j * tau**2 / 2,
+                a + j * tau)
 
 
 class SCurve:
     def generate_s_curve_profile(max_v, max_a, time_to_max_a, dt, goal):
         """Returns an s-curve profile with the given constraints.
 
+        Samples are taken from the closed-form SCurveProfile, so positions
+        do not drift with dt.
+
         Returns:
         t_rec -- list of timestamps
         x_rec -- list of positions at each timestep
@@ -19,71 +156,9 @@ class SCurve:
         dt -- timestep
         goal -- final position when the profile is at rest
         """
-        t_rec = [0.0]
-        x_rec = [0.0]
-        v_rec = [0.0]
-        a_rec = [0.0]
-
-        j = max_a / time_to_max_a
-        short_profile = max_v * (time_to_max_a + max_v / max_a) > goal
+        profile = SCurveProfile(max_v, max_a, time_to_max_a, goal)
 
-        if short_profile:
-            profile_max_v = max_a * (
-                math.sqrt(goal / max_a - 0.75 * time_to_max_a**2) -
-                0.5 * time_to_max_a
-            )
-        else:
-            profile_max_v = max_v
+        t = np.arange(math.ceil(profile.total_time / dt) + 1) * dt
+        x, v, a = profile.calculate_many(t)
 
-        # Find times at critical points
-        t2 = profile_max_v / max_a
-        t3 = t2 + time_to_max_a
-        if short_profile:
-            t4 = t3
-        else:
-            t4 = goal / profile_max_v
-        t5 = t4 + time_to_max_a
-        t6 = t4 + t2
-        t7 = t6 + time_to_max_a
-        time_total = t7
-
-        while t_rec[-1] < time_total:
-            t = t_rec[-1] + dt
-            t_rec.append(t)
-            if t < time_to_max_a:
-                # Ramp up acceleration
-                a_rec.append(j * t)
-                v_rec.append(0.5 * j * t**2)
-            elif t < t2:
-                # Increase speed at max acceleration
-                a_rec.append(max_a)
-                v_rec.append(max_a * (t - 0.5 * time_to_max_a))
-            elif t < t3:
-                # Ramp down acceleration
-                a_rec.append(max_a - j * (t - t2))
-                v_rec.append(max_a * (t - 0.5 * time_to_max_a) -
-                             0.5 * j * (t - t2) ** 2)
-            elif t < t4:
-                # Maintain max velocity
-                a_rec.append(0.0)
-                v_rec.append(profile_max_v)
-            elif t < t5:
-                # Ramp down acceleration
-                a_rec.append(-j * (t - t4))
-                v_rec.append(profile_max_v - 0.5 * j * (t - t4) ** 2)
-            elif t < t6:
-                # Decrease speed at max acceleration
-                a_rec.append(-max_a)
-                v_rec.append(max_a * (t2 + t5 - t - 0.5 * time_to_max_a))
-            elif t < t7:
-                # Ramp up acceleration
-                a_rec.append(-max_a + j * (t - t6))
-                v_rec.append(
-                    max_a * (t2 + t5 - t - 0.5 * time_to_max_a) +
-                    0.5 * j * (t - t6) ** 2
-                )
-            else:
-                a_rec.append(0.0)
-                v_rec.append(0.0)
-            x_rec.append(x_rec[-1] + v_rec[-1] * dt)
-        return t_rec, x_rec, v_rec, a_rec
+        return t.tolist(), x.tolist(), v.tolist(), a.tolist()
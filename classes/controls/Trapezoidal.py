@@ -1,5 +1,7 @@
 from dataclasses import dataclass
+from typing import Tuple
 import math
+import numpy as np
 
 
 @dataclass
@@ -24,14 +26,15 @@ class TrapezoidProfile:
     def __init__(self, constraints: Constraints, goal: State, initial: State = None) -> None:
 
         if initial is None:
-            return TrapezoidProfile(constraints, goal, State(0, 0))
+            initial = State(0, 0)
 
-        self.initial = initial
-        self.goal = goal
+        self.__direction = -1 if initial.position > goal.position else 1
 
         self.constraints = constraints
-        self.initial = initial.change_direction(self.__direction)
-        self.goal = goal.change_direction(self.__direction)
+        self.initial = State(initial.position, initial.velocity).change_direction(
+            self.__direction)
+        self.goal = State(goal.position, goal.velocity).change_direction(
+            self.__direction)
 
         if self.initial.velocity > self.constraints.max_velocity:
             self.initial.velocity = self.constraints.max_velocity
@@ -81,10 +84,45 @@ class TrapezoidProfile:
                 (self.goal.velocity + time_left *
                  self.constraints.max_acceleration / 2.0) * time_left
         else:
-            result = self.goal
+            result = State(self.goal.position, self.goal.velocity)
 
         return result.change_direction(self.__direction)
 
+    def calculate_many(self, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Evaluates the profile at every timestamp in one vectorized pass.
+
+        Returns:
+        position -- array of positions, same shape as t
+        velocity -- array of velocities, same shape as t
+        """
+        t = np.asarray(t, dtype=float)
+        max_acceleration = self.constraints.max_acceleration
+        max_velocity = self.constraints.max_velocity
+
+        accelerating = t < self.__end_acceleration
+        fullspeed = ~accelerating & (t < self.__end_fullspeed)
+        deccelerating = ~accelerating & ~fullspeed & (t <= self.__end_deccel)
+
+        time_left = self.__end_deccel - t
+        fullspeed_start = (self.initial.velocity + self.__end_acceleration *
+                           max_acceleration / 2) * self.__end_acceleration
+
+        velocity = np.select(
+            [accelerating, fullspeed, deccelerating],
+            [self.initial.velocity + t * max_acceleration,
+             max_velocity,
+             self.goal.velocity + time_left * max_acceleration],
+            self.goal.velocity)
+        position = np.select(
+            [accelerating, fullspeed, deccelerating],
+            [self.initial.position + (self.initial.velocity + t * max_acceleration / 2) * t,
+             self.initial.position + fullspeed_start +
+             max_velocity * (t - self.__end_acceleration),
+             self.goal.position - (self.goal.velocity + time_left * max_acceleration / 2.0) * time_left],
+            self.goal.position)
+
+        return position * self.__direction, velocity * self.__direction
+
     def time_left_until(self, target: float):
         position = self.initial.position * self.__direction
         velocity = self.initial.velocity * self.__direction
@@ -146,7 +184,3 @@ class TrapezoidProfile:
     @property
     def total_time(self):
         return self.__end_deccel
-
-    @property
-    def __direction(self):
-        return -1 if self.initial.position > self.goal.position else 1
@@ -1 +1,2 @@
 from .ArmFeedforward import ArmFeedforward
+from .PID import PID, PIDBatch
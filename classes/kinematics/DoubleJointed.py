@@ -1,12 +1,19 @@
-import pymunk
 import math
+import numpy as np
+from typing import NamedTuple, Tuple
+
+
+class Point(NamedTuple):
+    """Stand-in for pymunk.Vec2d, so kinematics does not need pymunk."""
+    x: float
+    y: float
 
 
 class DoubleJointed:
     def __init__(self, arm_length: int, wrist_length: int) -> None:
         self.arm_length = arm_length
         self.wrist_length = wrist_length
-        self.position = pymunk.Vec2d(0, 0)
+        self.position = Point(0, 0)
 
     def calculate_angles(self):
         d = math.sqrt(math.pow(self.position.x, 2) +
@@ -23,12 +30,47 @@ class DoubleJointed:
         q2 = math.acos(q2)
 
         # Elbow angle
-        q1 = math.atan(self.position.y / self.position.x) - math.atan(
-            (self.wrist_length * math.sin(q2)) / (self.wrist_length * math.cos(q2) + self.arm_length))
+        q1 = math.atan2(self.position.y, self.position.x) - math.atan2(
+            self.wrist_length * math.sin(q2), self.wrist_length * math.cos(q2) + self.arm_length)
 
         ## NEGATIVE ##
         # Elbow angle
-        q1_different = math.atan(self.position.y / self.position.x) + math.atan(
-            (self.wrist_length * math.sin(q2)) / (self.wrist_length * math.cos(q2) + self.arm_length))
+        q1_different = math.atan2(self.position.y, self.position.x) + math.atan2(
+            self.wrist_length * math.sin(q2), self.wrist_length * math.cos(q2) + self.arm_length)
 
         return (q1, q2), (q1_different, -q2)
+
+    def solve(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Solves both joint configurations for many endpoints at once.
+
+        Does not touch self.position.
+
+        Returns:
+        positive -- (N, 2) array of (q1, q2) with a positive wrist angle
+        negative -- (N, 2) array of (q1, q2) with a negative wrist angle
+        reachable -- (N,) boolean mask, angles of unreachable points are nan
+
+        Keyword arguments:
+        points -- (N, 2) array of endpoints relative to the shoulder
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        x = points[:, 0]
+        y = points[:, 1]
+
+        d = np.hypot(x, y)
+        reachable = (d <= self.arm_length + self.wrist_length) & (
+            d >= abs(self.arm_length - self.wrist_length))
+
+        q2 = (x**2 + y**2 - self.arm_length**2 - self.wrist_length**2) / \
+            (2 * self.arm_length * self.wrist_length)
+        q2 = np.arccos(np.clip(q2, -1, 1))
+        q2[~reachable] = np.nan
+
+        base = np.arctan2(y, x)
+        offset = np.arctan2(self.wrist_length * np.sin(q2),
+                            self.wrist_length * np.cos(q2) + self.arm_length)
+
+        positive = np.stack([base - offset, q2], axis=1)
+        negative = np.stack([base + offset, -q2], axis=1)
+
+        return positive, negative, reachable
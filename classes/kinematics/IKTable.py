@@ -0,0 +1,144 @@
+import math
+import os
+import numpy as np
+from typing import Optional, Tuple
+from .DoubleJointed import DoubleJointed
+
+JointLimits = Tuple[Tuple[float, float], Tuple[float, float]]
+
+
+class IKTable:
+    """Precomputed DoubleJointed solutions over a square grid covering the workspace.
+
+    The grid stores (q1, q2) for the positive and the negative solution of
+    every cell, with zeros for unreachable cells. Queries interpolate
+    bilinearly between the four surrounding cells, so each lookup is O(1).
+    """
+
+    def __init__(self, arm_length: float, wrist_length: float, resolution: float = 1.0, joint_limits: Optional[JointLimits] = None, cache_dir: Optional[str] = None) -> None:
+        self.arm_length = arm_length
+        self.wrist_length = wrist_length
+        self.resolution = resolution
+        self.extent = arm_length + wrist_length
+        self.size = int(math.ceil(2 * self.extent / resolution)) + 1
+
+        self.angles = self.__load(cache_dir) if cache_dir is not None else None
+        if self.angles is None:
+            self.angles = self.__build()
+            if cache_dir is not None:
+                self.__save(cache_dir)
+
+        axis = np.arange(self.size) * self.resolution - self.extent
+        x, y = np.meshgrid(axis, axis, indexing="ij")
+        self.reachable = self.__reachable(np.hypot(x, y))
+        self.joint_limits = joint_limits
+        self.feasible = self.__feasible(self.angles) & self.reachable[..., None]
+
+    @property
+    def cache_name(self) -> str:
+        return f"ik_{self.arm_length}_{self.wrist_length}_{self.resolution}.npy"
+
+    def __build(self) -> np.ndarray:
+        axis = np.arange(self.size) * self.resolution - self.extent
+        x, y = np.meshgrid(axis, axis, indexing="ij")
+
+        positive, negative, _ = DoubleJointed(self.arm_length, self.wrist_length).solve(
+            np.stack([x.ravel(), y.ravel()], axis=1))
+
+        angles = np.concatenate([positive, negative], axis=1)
+
+        # nan makes every interpolation slower, unreachable cells are masked instead
+        return np.nan_to_num(angles).reshape(self.size, self.size, 4)
+
+    def __reachable(self, distance: np.ndarray) -> np.ndarray:
+        return (distance <= self.extent) & (distance >= abs(self.arm_length - self.wrist_length))
+
+    def __load(self, cache_dir: str) -> Optional[np.ndarray]:
+        path = os.path.join(cache_dir, self.cache_name)
+        if not os.path.exists(path):
+            return None
+
+        angles = np.load(path, mmap_mode="r")
+        if angles.shape != (self.size, self.size, 4):
+            return None
+
+        return angles
+
+    def __save(self, cache_dir: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, self.cache_name)
+
+        # Write to a temporary file first so readers never see a partial table
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            np.save(file, self.angles)
+        os.replace(temporary, path)
+
+    def __feasible(self, angles: np.ndarray) -> np.ndarray:
+        """Returns a (..., 2) mask of which solutions are reachable and inside the joint limits."""
+        q1 = angles[..., 0::2]
+        q2 = angles[..., 1::2]
+        feasible = ~np.isnan(q1)
+        if self.joint_limits is not None:
+            (q1_min, q1_max), (q2_min, q2_max) = self.joint_limits
+            with np.errstate(invalid="ignore"):
+                feasible &= (q1 >= q1_min) & (q1 <= q1_max) & (
+                    q2 >= q2_min) & (q2 <= q2_max)
+
+        return feasible
+
+    def lookup_many(self, points: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Interpolates both solutions for many endpoints at once.
+
+        Returns:
+        positive -- (N, 2) array of (q1, q2) with a positive wrist angle
+        negative -- (N, 2) array of (q1, q2) with a negative wrist angle
+        reachable -- (N,) boolean mask, angles of unreachable points are nan
+        feasible -- (N, 2) boolean mask of solutions inside the joint limits
+
+        Keyword arguments:
+        points -- (N, 2) array of endpoints relative to the shoulder
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        grid = (points + self.extent) / self.resolution
+
+        grid = np.clip(grid, 0, self.size - 1)
+        low = np.minimum(np.floor(grid).astype(int), self.size - 2)
+        fraction = grid - low
+
+        ix = low[:, 0]
+        iy = low[:, 1]
+        corners = np.stack([self.angles[ix, iy], self.angles[ix + 1, iy],
+                            self.angles[ix, iy + 1], self.angles[ix + 1, iy + 1]])
+
+        # Interpolate angles relative to the first corner so the atan2 seam does not blend through zero
+        difference = corners - corners[0]
+        difference -= 2 * math.pi * np.round(difference / (2 * math.pi))
+        corners = corners[0] + difference
+
+        fx = fraction[:, 0, None]
+        fy = fraction[:, 1, None]
+        angles = (corners[0] * (1 - fx) * (1 - fy) + corners[1] * fx * (1 - fy) +
+                  corners[2] * (1 - fx) * fy + corners[3] * fx * fy)
+
+        reachable = self.__reachable(np.hypot(points[:, 0], points[:, 1]))
+
+        # Cells on the workspace edge have unreachable corners, solve those points exactly
+        exact = reachable & ~(self.reachable[ix, iy] & self.reachable[ix + 1, iy] &
+                              self.reachable[ix, iy + 1] & self.reachable[ix + 1, iy + 1])
+        if np.any(exact):
+            positive, negative, _ = DoubleJointed(
+                self.arm_length, self.wrist_length).solve(points[exact])
+            angles[exact] = np.concatenate([positive, negative], axis=1)
+
+        angles[~reachable] = np.nan
+
+        return angles[:, 0:2], angles[:, 2:4], reachable, self.__feasible(angles)
+
+    def lookup(self, position):
+        positive, negative, reachable, _ = self.lookup_many(
+            [(position.x, position.y)])
+        if not reachable[0]:
+            return
+
+        return tuple(positive[0].tolist()), tuple(negative[0].tolist())
@@ -1,14 +1,22 @@
+import argparse
 import math
 import arcade
 import pymunk
 from typing import Optional, List
-from classes import Robot
-from classes.controls.Trapezoidal import State, Constraints, TrapezoidProfile
+from classes import Robot, Simulation
+from classes import Scene
+from classes.Overlay import Overlay
+from classes.Recorder import LogReader, Replay
+from classes.Profiler import profiler
+from classes.Telemetry import SimulationTelemetry, TelemetryServer
+from classes.Graph import Graph
+from classes.controls.Trapezoidal import State, Constraints
 
 
 SCREEN_TITLE = "pymunk simlation"
 WIDTH = 800
 HEIGHT = 608
+SCENE_CACHE = ".scene_cache"
 
 
 class GameWindow(arcade.Window):
@@ -22,6 +30,9 @@ class GameWindow(arcade.Window):
         self.wall_list: Optional[arcade.SpriteList] = None
         self.joints: Optional[List[pymunk.Constraint]] = None
         self.physics_engine: Optional[arcade.PymunkPhysicsEngine] = None
+        self.simulation: Optional[Simulation] = None
+        self.overlay: Optional[Overlay] = None
+        self.replay: Optional[Replay] = None
 
         self.robot: Optional[Robot] = None
 
@@ -30,19 +41,27 @@ class GameWindow(arcade.Window):
         self.mouse_left_click: Optional[bool] = None
         self.mouse_ball: Optional[arcade.SpriteCircle] = None
 
-    def setup(self):
+    def setup(self, scene: Optional[Scene.SceneSpec] = None):
         """ Set up everything with the game """
-        self.physics_engine = arcade.PymunkPhysicsEngine((0, -980))
+        if scene is not None:
+            self.simulation = Scene.build(scene)
+        else:
+            self.simulation = Simulation(
+                self.width, self.height, robot_offset=pymunk.Vec2d(200, 100), boundary_offset=10)
+        self.physics_engine = self.simulation.physics_engine
         self.ball_list = arcade.SpriteList()
         self.robot_segments = arcade.SpriteList()
-        self.wall_list = arcade.SpriteList()
-        self.robot = Robot(self.physics_engine, offset=pymunk.Vec2d(200, 100))
+        self.wall_list = self.simulation.wall_list
+        self.robot = self.simulation.robot
         self.joints = []
+        self.overlay = Overlay()
+        self.overlay.add_sprite_list(self.ball_list)
+        self.overlay.add_sprite_list(self.robot_segments)
+        self.overlay.add_sprite_list(self.simulation.sprite_list)
         self.mouse_position = (0, 0)
         self.mouse_left_click = False
 
         # self.create_arm()
-        self.create_boundaries(10)
 
     def create_robot_segment(self, position: tuple, width: int, height: int, color: arcade.Color, mass: int):
         sprite = arcade.sprite.SpriteSolidColor(width, height, color)
@@ -77,7 +96,10 @@ class GameWindow(arcade.Window):
 
     def on_key_press(self, key, modifiers):
         """Called whenever a key is pressed. """
-        pass
+        if key == arcade.key.F3:
+            profiler.enabled = not profiler.enabled
+        elif key == arcade.key.F4:
+            profiler.export("profile.json")
 
     def on_key_release(self, key, modifiers):
         """Called when the user releases a key. """
@@ -85,29 +107,39 @@ class GameWindow(arcade.Window):
 
     def on_update(self, delta_time):
         """ Movement and game logic """
-        for _ in range(10):
-            self.physics_engine.step(delta_time / 10)
+        with profiler.scope("update"):
+            self.update_scene(delta_time)
+
+    def update_scene(self, delta_time):
+        if self.replay is not None:
+            if self.replay.next():
+                self.robot.graph.append_data(
+                    "Target", self.robot.arm_target_angle)
+                self.robot.graph.append_data(
+                    "Actual", self.robot.arm_body.body.angle)
+            return
 
         # self.robot.move_endpoint(pymunk.Vec2d(
         #     self.robot.ik.position.x-0.5, self.robot.ik.position.y+0.5))
 
-        self.robot.on_update()
+        self.simulation.advance(delta_time)
 
         # self.physics_engine.resync_sprites()
 
     def on_draw(self):
         """ Draw everything """
-        self.clear()
-        self.ball_list.draw()
-        self.wall_list.draw()
-        self.robot_segments.draw()
-        self.draw_line()
-        self.robot.draw()
-
-        for joint in self.joints:
-            color = arcade.color.BLUE
-            arcade.draw_line(joint.a.position.x, joint.a.position.y,
-                             joint.b.position.x, joint.b.position.y, color, 3)
+        with profiler.scope("draw"):
+            self.clear()
+            self.draw_line()
+
+            for joint in self.joints:
+                self.overlay.add_joint(joint)
+
+            self.overlay.draw()
+            self.robot.graph.draw()
+
+        if profiler.enabled:
+            profiler.draw_overlay()
 
     def create_ball(self, x, y, radius, mass, static=False, color=arcade.color.CRIMSON):
         ball = arcade.SpriteCircle(radius, color, False)
@@ -126,33 +158,11 @@ class GameWindow(arcade.Window):
             body_type=arcade.PymunkPhysicsEngine.DYNAMIC
         )
 
-    def create_boundaries(self, offset: int):
-        positions = [
-            [(WIDTH / 2, offset / 2), (WIDTH, offset)],
-            [(offset / 2, HEIGHT / 2), (offset, HEIGHT)],
-            [(WIDTH - offset / 2, HEIGHT / 2), (offset, HEIGHT)],
-            [(WIDTH / 2, HEIGHT - offset / 2), (WIDTH, offset)]
-        ]
-        for pos, size in positions:
-            wall = arcade.SpriteSolidColor(
-                size[0], size[1], arcade.color.BLACK)
-            wall.position = pos
-            self.wall_list.append(wall)
-
-        self.physics_engine.add_sprite_list(
-            self.wall_list,
-            body_type=arcade.PymunkPhysicsEngine.STATIC,
-            elasticity=0.4,
-            friction=0.5
-        )
-
     def draw_line(self):
         if self.mouse_left_click:
-            arcade.draw_line(self.mouse_ball.center_x, self.mouse_ball.center_y,
-                             self.mouse_position[0], self.mouse_position[1], arcade.color.BLACK, 2)
-            self.robot.motion = TrapezoidProfile(
-                Constraints(2, 1), State(math.pi / 2, 0), State(self.robot.arm_body.body.angle, 0))
-            self.robot.timer.start()
+            self.overlay.add_line(self.mouse_ball.center_x, self.mouse_ball.center_y,
+                                  self.mouse_position[0], self.mouse_position[1], arcade.color.BLACK, 2)
+            self.robot.move_arm_to(State(math.pi / 2, 0), Constraints(2, 1))
 
     def calculate_distance(self, p1, p2):
         return math.sqrt((p2[1] - p1[1]) ** 2 + (p2[0] - p1[0]) ** 2)
@@ -162,9 +172,45 @@ class GameWindow(arcade.Window):
 
 
 def main():
-    window = GameWindow(WIDTH, HEIGHT, SCREEN_TITLE)
-    window.setup()
+    parser = argparse.ArgumentParser(description=SCREEN_TITLE)
+    parser.add_argument("log", nargs="?", help="replay a recorded log instead of simulating")
+    parser.add_argument("--scene", help="load the scene from a JSON or TOML file")
+    parser.add_argument("--telemetry", type=int, metavar="PORT",
+                        help="stream live telemetry on this localhost port")
+    parser.add_argument("--plot", action="store_true",
+                        help="plot the arm in a separate matplotlib window instead of in the scene")
+    options = parser.parse_args()
+
+    scene = Scene.load(options.scene, SCENE_CACHE) if options.scene is not None else None
+    if scene is not None:
+        window = GameWindow(scene.width, scene.height, SCREEN_TITLE)
+    else:
+        window = GameWindow(WIDTH, HEIGHT, SCREEN_TITLE)
+    window.setup(scene)
+    if options.log is not None:
+        window.replay = Replay(LogReader(options.log), window.simulation)
+
+    server = None
+    if options.telemetry is not None:
+        server = TelemetryServer(port=options.telemetry)
+        server.start()
+        window.simulation.telemetry = SimulationTelemetry(
+            window.simulation, server)
+
+    if options.plot:
+        graph = Graph(300, 500, 600, 200, "arm PID")
+        for parameter in window.robot.graph.parameters.values():
+            graph.add_parameter(parameter.label, parameter.color)
+        if not window.robot.graph.auto_zoom:
+            graph.set_min(window.robot.graph.min)
+            graph.set_max(window.robot.graph.max)
+        window.robot.graph = graph
+
     arcade.run()
+    if server is not None:
+        server.stop()
+    if options.plot:
+        window.robot.graph.close()
 
 
 if __name__ == "__main__":